@@ -0,0 +1,64 @@
+import numpy as np
+
+# -----------------------------
+# จุดศูนย์ถ่วงและน้ำหนักลงเพลา
+# -----------------------------
+# แกน y คือความยาวรถ เริ่มจากหน้ากระบะ (y = 0) ไปทางท้าย
+# axles = {'front_y', 'rear_y', 'front_max', 'rear_max'} ตำแหน่งเพลาหน้า/หลัง (ซม. ตามแกน y
+# เพลาหน้ามักอยู่ใต้หัวเก๋งจึงติดลบได้) และน้ำหนักสินค้าสูงสุดที่ลงแต่ละเพลา (กก.)
+# น้ำหนักลงเพลาคิดแบบคานสองจุดรองรับ: rear = W * (y_cg - front_y) / (rear_y - front_y)
+
+# ค่าคลาดเคลื่อนเมื่อเทียบกับขีดจำกัด (กก.)
+TOLERANCE = 1e-6
+
+
+def axle_split(weight, moment_y, axles):
+    # คืน (น้ำหนักลงเพลาหน้า, น้ำหนักลงเพลาหลัง) จากน้ำหนักรวมและโมเมนต์รอบ y = 0
+    span = axles['rear_y'] - axles['front_y']
+    rear = (moment_y - weight * axles['front_y']) / span
+    return weight - rear, rear
+
+
+class LoadBalance:
+    # ผลรวมน้ำหนักและโมเมนต์ที่อัปเดตได้ทีละการวาง O(1)
+    def __init__(self, axles=None):
+        self.axles = axles
+        self.weight = 0.0
+        self.moment = [0.0, 0.0, 0.0]
+
+    def allows(self, weight, center):
+        if self.axles is None:
+            return True
+        front, rear = axle_split(self.weight + weight, self.moment[1] + weight * center[1], self.axles)
+        return (front <= self.axles['front_max'] + TOLERANCE and
+                rear <= self.axles['rear_max'] + TOLERANCE)
+
+    def add(self, weight, center):
+        self.weight += weight
+        for axis in range(3):
+            self.moment[axis] += weight * center[axis]
+
+    def state(self):
+        return self.weight, tuple(self.moment)
+
+    def restore(self, state):
+        self.weight, moment = state
+        self.moment = list(moment)
+
+
+def center_of_gravity(placements):
+    # จุดศูนย์ถ่วง (x, y, z) ของกล่องทั้งหมด หรือ None ถ้ายังไม่มีน้ำหนัก
+    d = placements.data
+    weight = d['weight'].astype('f8')
+    total = weight.sum()
+    if total <= 0:
+        return None
+    centers = np.stack([d['x'] + d['w'] / 2, d['y'] + d['l'] / 2, d['z'] + d['h'] / 2], axis=1)
+    return tuple((weight @ centers / total).tolist())
+
+def axle_loads(placements, axles):
+    cog = center_of_gravity(placements)
+    if cog is None:
+        return 0.0, 0.0
+    weight = placements.total_weight()
+    return axle_split(weight, weight * cog[1], axles)
@@ -0,0 +1,229 @@
+import argparse
+import json
+import math
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+
+from optimize import optimize_pack
+from packing import ORDERINGS, ROTATIONS, STRATEGIES, pack_boxes
+from pallet import PALLETS, pack_palletized
+from plan_cache import PlanCache
+from plan_io import glb_bytes, plan_bytes
+
+# -----------------------------
+# จัดกล่องแบบ batch จากบรรทัดคำสั่ง (ไม่ต้องเปิด Streamlit)
+# -----------------------------
+# อินพุตเป็น JSONL หนึ่งบรรทัดต่อหนึ่งงาน:
+#   {"id": "...", "space": [w, l, h], "max_weight": 9500, "boxes": [{...}, ...]}
+# ใส่ "axles": {"front_y", "rear_y", "front_max", "rear_max"} เพื่อจำกัดน้ำหนักลงเพลาได้
+# และ "multi_drop": true เมื่อกล่องมี "stop" (ลำดับจุดส่ง)
+# "optimize": วินาที ให้ปรับปรุงแผนต่อด้วย optimize.py (ค่าเริ่มต้นจาก --optimize)
+# "pallet": ชื่อพาเลทใน pallet.PALLETS ให้จัดกล่องลงพาเลทก่อนแล้วจัดพาเลทลงรถ
+#   รูปแบบพาเลทแคชไว้ใน process จึงใช้ซ้ำระหว่างใบสั่งของ worker เดียวกัน
+#   ผลนับพื้นพาเลทแยกไว้ใน "pallets" ไม่รวมใน "packed" / "packed_count"
+# เอาต์พุตเป็น JSONL ตามลำดับเดียวกับอินพุต บรรทัดที่ผิดรูปแบบหรือจัดไม่สำเร็จได้ {"line", "error"} แทน
+
+BATCH_SIZE = 16
+
+PALLET_PATTERNS = PlanCache(maxsize=1024)
+
+
+def finite(value):
+    # ตัวเลขจาก JSON (ไม่รวม true/false) ที่เป็นค่าจำกัด ถ้าไม่ใช่คืน None (json.loads รับ NaN/Infinity ด้วย)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    try:
+        value = float(value)
+    except OverflowError:
+        return None
+    return value if math.isfinite(value) else None
+
+def check_manifest(manifest, max_optimize=None):
+    # ตรวจรูปแบบและค่าก่อนจัด ข้อผิดพลาดเป็น ValueError ที่บอกว่าช่องไหนผิด แทนที่จะไปพังกลางการจัด
+    # quantity / stop ที่เป็นจำนวนเต็มแบบทศนิยม (5.0) ถูกแปลงเป็น int ในที่
+    # max_optimize: วินาทีสูงสุดของ "optimize" ที่ยอมรับ (None คือไม่จำกัด) เช่นบริการที่รับงานจากเครื่องอื่น
+    if not isinstance(manifest, dict):
+        raise ValueError("manifest must be a JSON object")
+    space = manifest.get('space')
+    if not isinstance(space, list) or len(space) != 3 or not all((finite(v) or 0) > 0 for v in space):
+        raise ValueError("space must be [width, length, height] of finite numbers > 0")
+    max_weight = finite(manifest.get('max_weight'))
+    if max_weight is None or max_weight < 0:
+        raise ValueError("max_weight must be a finite number >= 0")
+    boxes = manifest.get('boxes')
+    if not isinstance(boxes, list):
+        raise ValueError("boxes must be a list")
+    for n, box in enumerate(boxes):
+        if not isinstance(box, dict):
+            raise ValueError(f"boxes[{n}] must be an object")
+        if not isinstance(box.get('id'), (str, int)) or isinstance(box.get('id'), bool):
+            raise ValueError(f"boxes[{n}].id must be a string or number")
+        for key in ('width', 'length', 'height'):
+            if not (finite(box.get(key)) or 0) > 0:
+                raise ValueError(f"boxes[{n}].{key} must be a finite number > 0")
+        weight = finite(box.get('weight'))
+        if weight is None or weight < 0:
+            raise ValueError(f"boxes[{n}].weight must be a finite number >= 0")
+        quantity = finite(box.get('quantity'))
+        if quantity is None or quantity < 0 or quantity != int(quantity):
+            raise ValueError(f"boxes[{n}].quantity must be a whole number >= 0")
+        # JSON อาจส่ง 5.0 มา ตัวจัดต้องการ int
+        box['quantity'] = int(quantity)
+        if box.get('rotation', 'fixed') not in ROTATIONS:
+            raise ValueError(f"boxes[{n}].rotation must be one of {', '.join(ROTATIONS)}")
+        stop = finite(box.get('stop', 1))
+        if stop is None or stop < 1 or stop != int(stop):
+            raise ValueError(f"boxes[{n}].stop must be a whole number >= 1")
+        if 'stop' in box:
+            box['stop'] = int(stop)
+    if manifest.get('strategy', 'maximal_space') not in STRATEGIES:
+        raise ValueError(f"strategy must be one of {', '.join(STRATEGIES)}")
+    if manifest.get('order', 'volume') not in ORDERINGS:
+        raise ValueError(f"order must be one of {', '.join(ORDERINGS)}")
+    if manifest.get('pallet') and manifest['pallet'] not in PALLETS:
+        raise ValueError(f"pallet must be one of {', '.join(PALLETS)}")
+    optimize = finite(manifest.get('optimize', 0))
+    if optimize is None or optimize < 0:
+        raise ValueError("optimize must be a finite number of seconds >= 0")
+    if max_optimize is not None and optimize > max_optimize:
+        raise ValueError(f"optimize must be at most {max_optimize:g} seconds")
+    axles = manifest.get('axles')
+    if axles is not None:
+        keys = ('front_y', 'rear_y', 'front_max', 'rear_max')
+        if not isinstance(axles, dict) or any(finite(axles.get(key)) is None for key in keys):
+            raise ValueError(f"axles must be an object with finite {', '.join(keys)}")
+        if axles['rear_y'] <= axles['front_y']:
+            raise ValueError("axles.rear_y must be greater than axles.front_y")
+
+def plan_manifest(manifest, strategy='maximal_space', optimize=0):
+    check_manifest(manifest)
+    options = dict(
+        strategy=manifest.get('strategy', strategy), order=manifest.get('order', 'volume'),
+        axles=manifest.get('axles'), multi_drop=manifest.get('multi_drop', False)
+    )
+    time_budget = manifest.get('optimize', optimize)
+    if manifest.get('pallet'):
+        placements, used_percent, total_weight, _ = pack_palletized(
+            tuple(manifest['space']), manifest['max_weight'], manifest['boxes'], pallet=manifest['pallet'],
+            cache=PALLET_PATTERNS, **options
+        )
+    elif time_budget > 0:
+        placements, used_percent, total_weight = optimize_pack(
+            tuple(manifest['space']), manifest['max_weight'], manifest['boxes'], time_budget=time_budget, **options
+        )
+    else:
+        placements, used_percent, total_weight = pack_boxes(
+            tuple(manifest['space']), manifest['max_weight'], manifest['boxes'], **options
+        )
+    return placements, used_percent, total_weight
+
+def export_manifest(manifest, strategy='maximal_space', fmt='plan', optimize=0):
+    # ผลการจัดเป็นไฟล์ .plan (plan_io.save_plan) หรือโมเดล 3 มิติ .glb
+    placements, used_percent, total_weight = plan_manifest(manifest, strategy, optimize)
+    if fmt == 'glb':
+        return glb_bytes(placements, manifest['space'])
+    if fmt != 'plan':
+        raise ValueError(f"unknown export format: {fmt!r}")
+    return plan_bytes(placements, manifest['space'], manifest['max_weight'], total_weight, manifest['boxes'],
+                      id=manifest.get('id'), used_percent=used_percent, axles=manifest.get('axles'),
+                      multi_drop=manifest.get('multi_drop', False))
+
+def pack_manifest(manifest, strategy='maximal_space', include_placements=False, optimize=0):
+    placements, used_percent, total_weight = plan_manifest(manifest, strategy, optimize)
+    counts = np.bincount(placements.data['type'], minlength=len(placements.types))
+    deck_id = f"pallet-{manifest['pallet']}" if manifest.get('pallet') else None
+    packed, pallets = {}, 0
+    for box_id, count in zip(placements.types, counts):
+        if box_id == deck_id:
+            pallets += int(count)
+        else:
+            packed[box_id] = packed.get(box_id, 0) + int(count)
+    requested = {}
+    for box in manifest['boxes']:
+        requested[box['id']] = requested.get(box['id'], 0) + box['quantity']
+
+    result = {
+        'id': manifest.get('id'),
+        'used_percent': used_percent,
+        'total_weight': total_weight,
+        'packed_count': sum(packed.values()),
+        'packed': packed,
+        'unpacked': {
+            box_id: quantity - packed.get(box_id, 0)
+            for box_id, quantity in requested.items() if quantity > packed.get(box_id, 0)
+        },
+    }
+    if deck_id is not None:
+        result['pallets'] = pallets
+    if include_placements:
+        d = placements.data
+        result['placements'] = {
+            'types': placements.types,
+            'columns': ['type', 'x', 'y', 'z', 'w', 'l', 'h'],
+            'rows': np.column_stack([d['type'], d['x'], d['y'], d['z'], d['w'], d['l'], d['h']]).tolist(),
+        }
+    return result
+
+def pack_lines(lines, strategy, include_placements, optimize=0):
+    # งานหนึ่งชิ้นของ worker คือหลายบรรทัด เพื่อลดค่าใช้จ่ายการส่งข้อมูลระหว่าง process
+    out = []
+    for number, line in lines:
+        try:
+            manifest = json.loads(line)
+            result = pack_manifest(manifest, strategy, include_placements, optimize)
+        except Exception as e:
+            # ทุกข้อผิดพลาดเป็นผลของบรรทัดนั้น บรรทัดอื่นใน batch เดียวกันยังจัดต่อได้
+            result = {'line': number, 'error': f"{type(e).__name__}: {e}"}
+        out.append(json.dumps(result, ensure_ascii=False))
+    return out
+
+def read_batches(stream, size):
+    numbered = ((n, line) for n, line in enumerate(stream, start=1) if line.strip())
+    while True:
+        batch = list(islice(numbered, size))
+        if not batch:
+            return
+        yield batch
+
+def run_batch(stream, out, strategy='maximal_space', workers=None, include_placements=False, optimize=0):
+    workers = workers or os.cpu_count() or 1
+    # จำกัดจำนวนงานที่ค้างอยู่ เพื่อไม่ต้องอ่านอินพุตทั้งไฟล์เข้าหน่วยความจำ
+    in_flight = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for batch in read_batches(stream, BATCH_SIZE):
+            in_flight.append(pool.submit(pack_lines, batch, strategy, include_placements, optimize))
+            if len(in_flight) >= workers * 2:
+                out.write('\n'.join(in_flight.popleft().result()) + '\n')
+        while in_flight:
+            out.write('\n'.join(in_flight.popleft().result()) + '\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack JSONL manifests without the Streamlit UI.")
+    parser.add_argument('input', nargs='?', default='-', help="JSONL manifests (default: stdin)")
+    parser.add_argument('-o', '--output', default='-', help="JSONL results (default: stdout)")
+    parser.add_argument('--strategy', choices=STRATEGIES, default='maximal_space')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--placements', action='store_true', help="include every placed box in the output")
+    parser.add_argument('--optimize', type=float, default=0, metavar='SECONDS',
+                        help="improve each plan with local search for this long (e.g. 60)")
+    args = parser.parse_args(argv)
+
+    stream = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        run_batch(stream, out, args.strategy, args.workers, args.placements, args.optimize)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from itertools import product
+
+import numpy as np
+
+from packing import STRATEGIES, calculate_volume, pack_boxes
+from render import box_figure
+
+# -----------------------------
+# ชุดวัดความเร็วการจัดกล่องแบบทำซ้ำได้
+# -----------------------------
+# สร้าง manifest สังเคราะห์จาก seed แล้ววัดเวลาจัด, จำนวนกล่องต่อวินาที,
+# หน่วยความจำสูงสุด, เวลาสร้างรูป 3 มิติ และเปอร์เซ็นต์พื้นที่ที่ใช้
+# ผลลัพธ์เป็น JSON เพื่อเทียบระหว่าง commit ด้วย `python bench.py compare old.json new.json`
+
+# รถ/ตู้ตาม truck_types และ containers ใน ihere.py (รถใช้ขนาดเริ่มต้นของหน้าจอ 200x500x200)
+VEHICLES = {
+    "truck_4_wheel": {"width": 200, "length": 500, "height": 200, "max_weight": 9500},
+    "truck_6_wheel": {"width": 200, "length": 500, "height": 200, "max_weight": 15000},
+    "truck_10_wheel": {"width": 200, "length": 500, "height": 200, "max_weight": 25000},
+    "truck_12_wheel": {"width": 200, "length": 500, "height": 200, "max_weight": 30000},
+    "container_20ft": {"width": 244, "length": 610, "height": 251, "max_weight": 28000},
+    "container_40ft": {"width": 244, "length": 1220, "height": 251, "max_weight": 28000},
+    "container_40ft_hc": {"width": 244, "length": 1220, "height": 290, "max_weight": 28000},
+}
+
+SKU_COUNTS = {"few": 3, "many": 200}
+SIZE_RANGES = {"uniform": (35, 50), "mixed": (15, 120)}
+# (ปริมาตรรวม / ปริมาตรรถ, น้ำหนักรวม / น้ำหนักสูงสุด)
+BOUNDS = {"volume": (1.3, 0.5), "weight": (0.6, 1.5)}
+
+
+def generate_manifest(vehicle, skus, sizes, bound, seed):
+    rng = np.random.default_rng(seed)
+    low, high = SIZE_RANGES[sizes]
+    volume_ratio, weight_ratio = BOUNDS[bound]
+    dims = rng.integers(low, high + 1, size=(SKU_COUNTS[skus], 3))
+    share = rng.dirichlet(np.ones(len(dims)))
+
+    target_volume = volume_ratio * calculate_volume(vehicle['width'], vehicle['length'], vehicle['height'])
+    unit_volume = dims.prod(axis=1)
+    quantity = np.maximum(1, np.round(share * target_volume / unit_volume)).astype(int)
+    unit_weight = weight_ratio * vehicle['max_weight'] / quantity.sum()
+    weight = np.round(unit_weight * rng.uniform(0.5, 1.5, size=len(dims)), 2)
+
+    rotations = rng.choice(['fixed', 'upright', 'all'], size=len(dims))
+    return [
+        {'id': f"S{n}", 'width': int(w), 'length': int(l), 'height': int(h),
+         'weight': float(wt), 'quantity': int(q), 'rotation': str(rot)}
+        for n, ((w, l, h), wt, q, rot) in enumerate(zip(dims, weight, quantity, rotations))
+    ]
+
+def measure(vehicle, boxes, strategy, repeat):
+    dim = (vehicle['width'], vehicle['length'], vehicle['height'])
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        placements, used_percent, total_weight = pack_boxes(dim, vehicle['max_weight'], boxes, strategy=strategy)
+        times.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    pack_boxes(dim, vehicle['max_weight'], boxes, strategy=strategy)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    box_figure(placements, title="bench")
+    figure_seconds = time.perf_counter() - started
+
+    pack_seconds = min(times)
+    return {
+        'pack_seconds': pack_seconds,
+        'placements': len(placements),
+        'placements_per_second': len(placements) / pack_seconds if pack_seconds else None,
+        'peak_memory_bytes': peak,
+        'figure_seconds': figure_seconds,
+        'used_percent': used_percent,
+        'weight_percent': 100 * total_weight / vehicle['max_weight'],
+    }
+
+def run(vehicles=None, strategies=STRATEGIES, repeat=3, seed=0):
+    results = []
+    names = vehicles or list(VEHICLES)
+    for n, (name, skus, sizes, bound) in enumerate(product(names, SKU_COUNTS, SIZE_RANGES, BOUNDS)):
+        vehicle = VEHICLES[name]
+        boxes = generate_manifest(vehicle, skus, sizes, bound, seed + n)
+        for strategy in strategies:
+            row = {'vehicle': name, 'skus': skus, 'sizes': sizes, 'bound': bound, 'strategy': strategy,
+                   'units': sum(b['quantity'] for b in boxes)}
+            row.update(measure(vehicle, boxes, strategy, repeat))
+            results.append(row)
+            print(f"{name:18} {skus:4} {sizes:7} {bound:6} {strategy:13} "
+                  f"{row['pack_seconds'] * 1000:8.1f} ms {row['used_percent']:5.1f}%", file=sys.stderr)
+    return results
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def scenario_key(row):
+    return (row['vehicle'], row['skus'], row['sizes'], row['bound'], row['strategy'])
+
+def compare(old_path, new_path):
+    with open(old_path, encoding='utf-8') as f:
+        old = {scenario_key(r): r for r in json.load(f)['results']}
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)['results']
+    print(f"{'scenario':60} {'pack x':>8} {'figure x':>9} {'util Δ':>8}")
+    for row in new:
+        before = old.get(scenario_key(row))
+        if before is None:
+            continue
+        print(f"{' / '.join(scenario_key(row)):60} "
+              f"{row['pack_seconds'] / before['pack_seconds']:8.2f} "
+              f"{row['figure_seconds'] / before['figure_seconds']:9.2f} "
+              f"{row['used_percent'] - before['used_percent']:+8.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reproducible packing benchmark.")
+    commands = parser.add_subparsers(dest='command')
+    compare_args = commands.add_parser('compare', help="compare two result files")
+    compare_args.add_argument('old')
+    compare_args.add_argument('new')
+    parser.add_argument('-o', '--output', default='-', help="JSON results (default: stdout)")
+    parser.add_argument('--vehicle', action='append', choices=list(VEHICLES), help="limit to these vehicles")
+    parser.add_argument('--strategy', action='append', choices=STRATEGIES, help="limit to these strategies")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == 'compare':
+        compare(args.old, args.new)
+        return
+
+    report = {
+        'commit': git_commit(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'results': run(args.vehicle, args.strategy or STRATEGIES, args.repeat, args.seed),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from packing import calculate_volume, orientations, pack_boxes
+
+# -----------------------------
+# จัดสินค้าลงรถหลายคัน
+# -----------------------------
+# vehicle คือ dict: name, width, length, height, max_weight, count (จำนวนคันที่มี)
+# แต่ละรอบจะลองจัดสินค้าที่เหลือลงรถทุกประเภทที่ยังว่างพร้อมกันใน process pool
+# ถ้ามีรถที่รับของที่เหลือได้หมด เลือกคันที่เล็กที่สุด
+# ถ้าไม่มี เลือกคันที่บรรจุปริมาตรได้มากที่สุด เพื่อให้ใช้จำนวนคันน้อยที่สุด
+
+def vehicle_volume(vehicle):
+    return calculate_volume(vehicle['width'], vehicle['length'], vehicle['height'])
+
+def pack_vehicle(vehicle, boxes, strategy, progress=None):
+    # ใช้ลำดับของกล่องเป็น id ชั่วคราว เพื่อนับจำนวนที่จัดได้ของแต่ละรายการ
+    indexed = [dict(box, id=n) for n, box in enumerate(boxes)]
+    dim = (vehicle['width'], vehicle['length'], vehicle['height'])
+    placements, used_percent, total_weight = pack_boxes(dim, vehicle['max_weight'], indexed, strategy=strategy,
+                                                        axles=vehicle.get('axles'), progress=progress)
+    type_box = np.array(placements.types, dtype=int)
+    packed = np.bincount(type_box[placements.data['type']], minlength=len(boxes))
+    placements.types = [boxes[n]['id'] for n in placements.types]
+    return placements, used_percent, total_weight, packed
+
+def pack_fleet(vehicles, boxes, strategy='maximal_space', workers=None):
+    remaining = [dict(box) for box in boxes if box['quantity'] > 0]
+    available = {n: vehicle['count'] for n, vehicle in enumerate(vehicles)}
+    loads = []
+    if not vehicles:
+        return loads, remaining
+
+    workers = workers or min(len(vehicles), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while remaining:
+            candidates = [n for n, count in available.items() if count > 0]
+            if not candidates:
+                break
+            futures = {n: pool.submit(pack_vehicle, vehicles[n], remaining, strategy) for n in candidates}
+            results = {n: future.result() for n, future in futures.items()}
+
+            total_units = sum(box['quantity'] for box in remaining)
+            complete = [n for n in candidates if results[n][3].sum() == total_units]
+            if complete:
+                chosen = min(complete, key=lambda n: vehicle_volume(vehicles[n]))
+            else:
+                chosen = max(candidates, key=lambda n: (results[n][0].used_volume(), -vehicle_volume(vehicles[n])))
+
+            placements, used_percent, total_weight, packed = results[chosen]
+            if len(placements) == 0:
+                break
+
+            available[chosen] -= 1
+            loads.append({
+                'vehicle': vehicles[chosen]['name'],
+                'max_weight': vehicles[chosen]['max_weight'],
+                'placements': placements,
+                'used_percent': used_percent,
+                'total_weight': total_weight,
+            })
+            for box, count in zip(remaining, packed):
+                box['quantity'] -= int(count)
+            remaining = [box for box in remaining if box['quantity'] > 0]
+
+    return loads, remaining
+
+# -----------------------------
+# แนะนำรถคันเดียวที่ถูก / เล็กที่สุดที่รับของได้หมด
+# -----------------------------
+# ตัดรถที่รับไม่ได้แน่นอนออกก่อนด้วยขอบล่างราคาถูก (ขนาดกล่องทุกทิศที่วางได้, น้ำหนักรวม, ปริมาตรรวม)
+# แล้วจัดจริงเฉพาะคันที่เหลือพร้อมกันใน process pool และเลือกคันแรกตามลำดับ (cost, ปริมาตร, น้ำหนัก)
+# ที่จัดได้หมด คันที่อันดับต่ำกว่านั้นไม่ต้องรอผล
+# vehicle อาจมี cost (ไม่มีถือเป็น 0 แล้วเรียงตามขนาด)
+# เมื่อได้คำตอบแล้ว worker ที่ยังจัดคันอื่นอยู่หยุดเอง (ผ่าน progress ของ pack_boxes) ไม่ใช้ CPU ต่อ
+
+# Event ที่ worker ของ recommend_vehicle ได้รับตอนเริ่ม (ดู watch) ถูก set เมื่อไม่ต้องการผลแล้ว
+STOP = None
+
+def vehicle_rank(vehicle):
+    return vehicle.get('cost', 0), vehicle_volume(vehicle), vehicle['max_weight']
+
+def lower_bound_reason(vehicle, boxes):
+    # เหตุผลที่รถคันนี้รับกล่องทั้งหมดไม่ได้แน่นอน หรือ None ถ้ายังเป็นไปได้
+    boxes = [box for box in boxes if box['quantity'] > 0]
+    dim = (vehicle['width'], vehicle['length'], vehicle['height'])
+    for box in boxes:
+        if not any(all(s <= d for s, d in zip(size, dim)) for size in orientations(box)):
+            return f"box {box['id']} does not fit in any allowed orientation"
+    weight = sum(box['weight'] * box['quantity'] for box in boxes)
+    if weight > vehicle['max_weight']:
+        return f"total weight {weight:,.0f} kg exceeds {vehicle['max_weight']:,.0f} kg"
+    volume = sum(calculate_volume(box['width'], box['length'], box['height']) * box['quantity'] for box in boxes)
+    if volume > vehicle_volume(vehicle):
+        return f"total volume {volume:,.0f} cm³ exceeds {vehicle_volume(vehicle):,.0f} cm³"
+    return None
+
+def watch(stop):
+    global STOP
+    STOP = stop
+
+def pack_unless_stopped(vehicle, boxes, strategy):
+    # รันใน worker: คืน None ถ้าถูกสั่งหยุดกลางทาง เพราะแผนบางส่วนใช้ตัดสินไม่ได้
+    result = pack_vehicle(vehicle, boxes, strategy, progress=lambda placements: not STOP.is_set())
+    return None if STOP.is_set() else result
+
+def recommend_vehicle(vehicles, boxes, strategy='maximal_space', workers=None):
+    # คืน (ลำดับรถที่เลือกหรือ None, ผล pack_vehicle ของคันนั้นหรือ None, รายงานทุกคัน)
+    boxes = [box for box in boxes if box['quantity'] > 0]
+    total_units = sum(box['quantity'] for box in boxes)
+    report = [{'vehicle': vehicle['name'], 'status': 'skipped', 'reason': None, 'packed': None, 'used_percent': None}
+              for vehicle in vehicles]
+    candidates = []
+    for n in sorted(range(len(vehicles)), key=lambda n: vehicle_rank(vehicles[n])):
+        reason = lower_bound_reason(vehicles[n], boxes)
+        if reason is None:
+            candidates.append(n)
+        else:
+            report[n].update(status='ruled_out', reason=reason)
+    if not candidates:
+        return None, None, report
+
+    workers = workers or min(len(candidates), os.cpu_count() or 1)
+    # ไม่ใช้ with เพราะตอนออกจะรอคันที่ใหญ่กว่าซึ่งยังคำนวณอยู่ให้เสร็จ ทั้งที่พบคันที่บรรจุได้แล้ว
+    # shutdown(wait=False, cancel_futures=True) ยกเลิกงานที่ยังไม่เริ่มแล้วคืนผลทันที งานที่เริ่มแล้วหยุดเมื่อ set stop
+    stop = multiprocessing.Event()
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=watch, initargs=(stop,))
+    try:
+        futures = {n: pool.submit(pack_unless_stopped, vehicles[n], boxes, strategy) for n in candidates}
+        for n in candidates:
+            result = futures[n].result()
+            packed = int(result[3].sum())
+            fits = packed == total_units
+            report[n].update(status='fits' if fits else 'does_not_fit', packed=packed, used_percent=result[1])
+            if fits:
+                return n, result, report
+    finally:
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+    return None, None, report
@@ -0,0 +1,86 @@
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# -----------------------------
+# แผนที่ความสูงของพื้นรถ
+# -----------------------------
+# แบ่งพื้นรถเป็นช่องขนาด resolution x resolution ซม. เก็บความสูงผิวบนสุดของแต่ละช่อง
+# การถาม/อัปเดตใช้ slice ของ numpy ตามขนาดฐานกล่อง ไม่ขึ้นกับจำนวนกล่องที่วางไปแล้ว
+
+# ค่าคลาดเคลื่อนเมื่อเทียบความสูงแบบทศนิยม
+EPSILON = 1e-6
+
+
+class HeightMap:
+    def __init__(self, width, length, resolution=1):
+        self.resolution = resolution
+        self.cells = np.zeros((math.ceil(width / resolution - EPSILON),
+                               math.ceil(length / resolution - EPSILON)), dtype='f4')
+
+    def region(self, x, y, w, l):
+        # ช่องทั้งหมดที่ฐาน (x, y, w, l) ทับอยู่ แม้จะทับเพียงบางส่วน
+        r = self.resolution
+        x0, y0 = int(x / r + EPSILON), int(y / r + EPSILON)
+        x1 = max(math.ceil((x + w) / r - EPSILON), x0 + 1)
+        y1 = max(math.ceil((y + l) / r - EPSILON), y0 + 1)
+        return self.cells[x0:x1, y0:y1]
+
+    def cell_range(self, lo, hi):
+        # ช่วงดัชนีช่อง [เริ่ม, จบ) ที่ช่วง lo..hi ทับอยู่ เหมือน region ใช้ได้ทั้งค่าเดี่ยวและ array
+        r = self.resolution
+        start = np.floor(np.asarray(lo) / r + EPSILON).astype(int)
+        return start, np.maximum(np.ceil(np.asarray(hi) / r - EPSILON).astype(int), start + 1)
+
+    def block_support(self, x, y, w, l, z, nx, ny):
+        # สัดส่วนการรองรับของกล่องแต่ละใบในแถวล่างของก้อน nx * ny (ฐานใบละ w x l) เป็น array (nx, ny)
+        # นับช่องที่ความสูงเท่ากับ z ด้วยตารางผลรวมสะสมครั้งเดียว จึงไม่ต้องวนทีละกล่อง
+        if z <= EPSILON:
+            return np.ones((nx, ny))
+        r = self.resolution
+        xs = x + np.arange(nx) * w
+        ys = y + np.arange(ny) * l
+        x0 = (xs / r + EPSILON).astype(int)
+        y0 = (ys / r + EPSILON).astype(int)
+        x1 = np.maximum(np.ceil((xs + w) / r - EPSILON).astype(int), x0 + 1)
+        y1 = np.maximum(np.ceil((ys + l) / r - EPSILON).astype(int), y0 + 1)
+        cells = self.cells[x0[0]:x1[-1], y0[0]:y1[-1]]
+        table = np.zeros((cells.shape[0] + 1, cells.shape[1] + 1), dtype=np.int64)
+        table[1:, 1:] = (np.abs(cells - z) <= EPSILON).cumsum(axis=0).cumsum(axis=1)
+        x0, x1, y0, y1 = x0 - x0[0], x1 - x0[0], y0 - y0[0], y1 - y0[0]
+        hits = (table[x1][:, y1] - table[x0][:, y1] - table[x1][:, y0] + table[x0][:, y0])
+        area = (x1 - x0)[:, None] * (y1 - y0)[None, :]
+        return hits / area
+
+    def footprint_max(self, x, y, width, length, w, l):
+        # ความสูงสูงสุดใต้ฐานขนาด w x l สำหรับทุกตำแหน่งมุมในบริเวณ (x, y, width, length) พร้อมกัน
+        # ผลลัพธ์ [i, j] คือความสูงที่กล่องวางลงไปถึงถ้ามุมกล่องอยู่ที่ช่องที่ (i, j) นับจากมุมบริเวณ
+        cells = self.region(x, y, width, length)
+        nw, nl = self.footprint_cells(w, l)
+        if nw > cells.shape[0] or nl > cells.shape[1]:
+            return np.empty((0, 0), dtype=cells.dtype)
+        along_x = sliding_window_view(cells, nw, axis=0).max(axis=-1)
+        return sliding_window_view(along_x, nl, axis=1).max(axis=-1)
+
+    def footprint_support(self, x, y, width, length, w, l, rest):
+        # สัดส่วนช่องใต้ฐานที่สูงเท่ากับ rest[i, j] (ผลของ footprint_max) ทุกตำแหน่ง
+        # นับด้วยตารางผลรวมสะสมทีละระดับความสูงที่มีใน rest (nan คือไม่ต้องนับ ได้ 0)
+        cells = self.region(x, y, width, length)
+        nw, nl = self.footprint_cells(w, l)
+        support = np.zeros(rest.shape)
+        table = np.zeros((cells.shape[0] + 1, cells.shape[1] + 1), dtype=np.int64)
+        for level in np.unique(rest[~np.isnan(rest)]).tolist():
+            table[1:, 1:] = (np.abs(cells - level) <= EPSILON).cumsum(axis=0).cumsum(axis=1)
+            hits = table[nw:, nl:] - table[:-nw, nl:] - table[nw:, :-nl] + table[:-nw, :-nl]
+            at = rest == level
+            support[at] = hits[at] / (nw * nl)
+        return support
+
+    def footprint_cells(self, w, l):
+        r = self.resolution
+        return max(math.ceil(w / r - EPSILON), 1), max(math.ceil(l / r - EPSILON), 1)
+
+    def place(self, x, y, w, l, top):
+        cells = self.region(x, y, w, l)
+        np.maximum(cells, top, out=cells)
@@ -1,5 +1,23 @@
+import io
+import os
+from functools import partial
+
+import pandas as pd
 import streamlit as st
-import plotly.graph_objects as go
+from balance import axle_loads, center_of_gravity
+from fleet import pack_fleet, recommend_vehicle
+from jobs import PackingJob
+from manifest_io import read_manifest, read_table
+from optimize import AnytimeOptimizer
+from packing import IncrementalPacker
+from pallet import PALLETS, pack_palletized
+from plan_cache import PlanCache, cached_pack_boxes, manifest_key
+from plan_io import glb_bytes, load_plan, plan_bytes
+from portfolio import run_portfolio
+from profiling import NULL_PROFILER, Profiler
+from render import LOD_THRESHOLD, box_figure
+from route import rehandling_moves
+from validate import is_valid, validate_plan
 
 
 containers = {
@@ -23,84 +41,230 @@ truck_types = {
 }
 
 
-def calculate_volume(w, l, h):
-    return w * l * h
-
-def sort_boxes_by_volume(boxes):
-    return sorted(boxes, key=lambda b: calculate_volume(b['width'], b['length'], b['height']), reverse=True)
-
-def pack_boxes(space_w, space_l, space_h, max_weight, boxes):
-    used_volume = 0
-    total_weight = 0
-    packed_boxes = []
-
-    pos_x, pos_y, pos_z = 0, 0, 0
-    current_layer_height = 0
-
-    for box in sort_boxes_by_volume(boxes):
-        for _ in range(box['quantity']):
-            if (pos_x + box['width'] <= space_w and
-                pos_y + box['length'] <= space_l and
-                pos_z + box['height'] <= space_h):
-                
-                if total_weight + box['weight'] > max_weight:
-                    break
-                
-                packed_boxes.append({
-                    'id': box['id'],
-                    'pos': (pos_x, pos_y, pos_z),
-                    'dim': (box['width'], box['length'], box['height']),
-                    'weight': box['weight']
-                })
-
-                used_volume += calculate_volume(box['width'], box['length'], box['height'])
-                total_weight += box['weight']
-
-                pos_x += box['width']
-
-                if pos_x >= space_w:
-                    pos_x = 0
-                    pos_y += box['length']
-                    if pos_y >= space_l:
-                        pos_y = 0
-                        pos_z += current_layer_height
-                        current_layer_height = 0
-
-                current_layer_height = max(current_layer_height, box['height'])
-            else:
-                break
-
-    total_volume = calculate_volume(space_w, space_l, space_h)
-    used_percent = (used_volume / total_volume) * 100
-
-    return packed_boxes, used_percent, total_weight
-
-
-def visualize_boxes(packed_boxes):
-    fig = go.Figure()
-    for box in packed_boxes:
-        x, y, z = box['pos']
-        w, l, h = box['dim']
-        fig.add_trace(go.Mesh3d(
-            x=[x, x+w, x+w, x, x, x+w, x+w, x],
-            y=[y, y, y+l, y+l, y, y, y+l, y+l],
-            z=[z, z, z, z, z+h, z+h, z+h, z+h],
-            color='lightblue',
-            opacity=0.5,
-            alphahull=0,
-            name=f"Box {box['id']}"
-        ))
-
-    fig.update_layout(
-        scene=dict(
-            xaxis_title='Width (cm)',
-            yaxis_title='Length (cm)',
-            zaxis_title='Height (cm)'
-        ),
-        margin=dict(l=0, r=0, b=0, t=30),
-        title=" ภาพจำลองการจัดเรียงกล่อง"
-    )
-    st.plotly_chart(fig)
+# วินาทีระหว่างการอัปเดตความคืบหน้าของงานจัดกล่องเบื้องหลัง
+PROGRESS_REFRESH = 1.0
+
+
+@st.cache_data(max_entries=8)
+def load_manifest(data, name):
+    return read_manifest(io.BytesIO(data), name)
+
+
+@st.cache_resource
+def get_plan_cache():
+    # แคชเดียวใช้ร่วมกันทุก session; ตั้ง PLAN_CACHE_DIR เพื่อเก็บลงดิสก์ด้วย
+    return PlanCache(maxsize=128, directory=os.environ.get("PLAN_CACHE_DIR"))
+
+
+def get_incremental_packer(space_dim, max_weight, axles=None, multi_drop=False):
+    # เก็บไว้ต่อ session: แก้รายการกล่องแล้วกดคำนวณใหม่ จะจัดใหม่เฉพาะตั้งแต่ประเภทที่เปลี่ยน
+    packer = st.session_state.get("incremental_packer")
+    settings = (tuple(space_dim), max_weight, axles, multi_drop)
+    if packer is None or (packer.space_dim, packer.max_weight, packer.axles, packer.multi_drop) != settings:
+        packer = IncrementalPacker(space_dim, max_weight, axles=axles, multi_drop=multi_drop)
+        st.session_state["incremental_packer"] = packer
+    return packer
+
+
+def check_plan(placements, space_dim, max_weight, total_weight, profiler=NULL_PROFILER):
+    # ตรวจแผนก่อนแสดงผล คืน False ถ้ามีกล่องซ้อนทับ/ล้นพื้นที่/น้ำหนักเกิน
+    with profiler.phase("validate"):
+        counts, issues = validate_plan(placements, space_dim, max_weight, total_weight)
+    valid = is_valid(counts)
+    if not valid:
+        st.error("❌ แผนการจัดวางไม่ผ่านการตรวจสอบ (" +
+                 ", ".join(f"{kind} {count}" for kind, count in counts.items() if count) + ") จึงไม่แสดงภาพ")
+    elif counts["unsupported"]:
+        st.warning(f"⚠️ มีกล่อง {counts['unsupported']} ใบที่มีของรองรับด้านล่างไม่พอ")
+    if issues:
+        with st.expander("รายละเอียดการตรวจสอบ"):
+            st.dataframe([{"ปัญหา": kind, "กล่องที่": box, "รายละเอียด": detail} for kind, box, detail in issues])
+    return valid
+
+
+@st.fragment
+def visualize_boxes(packed_boxes, key=None, profiler=NULL_PROFILER):
+    # ตัวเลือกการแสดงผลอยู่ใน fragment จึงเปลี่ยนได้โดยไม่ต้องจัดกล่องใหม่
+    view = key or "chart"
+    with st.expander("🖼️ ตัวเลือกการแสดงผล 3 มิติ"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            lod = st.checkbox("รวมกล่องที่วางติดกันเป็นก้อน", value=True, key=f"{view}_lod")
+            threshold = st.number_input("เมื่อมีกล่องมากกว่า", min_value=0, value=LOD_THRESHOLD, step=500,
+                                        key=f"{view}_lod_threshold", disabled=not lod)
+        with col2:
+            wireframe = st.checkbox("แสดงเฉพาะขอบกล่อง", key=f"{view}_wireframe")
+        with col3:
+            by_layer = st.checkbox("ดูทีละชั้น", key=f"{view}_by_layer")
+
+    z_slice = None
+    if by_layer and len(packed_boxes):
+        levels = sorted(set(packed_boxes.data["z"].tolist()))
+        z_slice = st.select_slider("ความสูงของชั้น (cm)", options=levels, key=f"{view}_layer") if len(levels) > 1 else levels[0]
+
+    with profiler.phase("figure"):
+        fig = box_figure(packed_boxes, title=" ภาพจำลองการจัดเรียงกล่อง",
+                         lod_threshold=threshold if lod else None, wireframe=wireframe, z_slice=z_slice)
+    if profiler.enabled:
+        # st.plotly_chart แปลงเป็น JSON ภายใน จึงวัดขนาดแยกเฉพาะตอนเปิดวินิจฉัย
+        with profiler.phase("figure_json"):
+            profiler.count("figure_json_bytes", len(fig.to_json()))
+    with profiler.phase("plotly_chart"):
+        st.plotly_chart(fig, key=key)
+
+
+def compute_plan(job, plan, plan_cache, incremental=None):
+    # รันใน thread ของ PackingJob: ห้ามเรียก st.* คืน plan พร้อมผลการจัดและข้อมูลสำหรับ show_plan
+    space_dim, max_weight, boxes = plan["space_dim"], plan["max_weight"], plan["boxes"]
+    options = dict(strategy=plan["strategy"], axles=plan["axles"], multi_drop=plan["multi_drop"])
+    profiler = plan["profiler"]
+    with profiler.phase("compute"):
+        if plan["use_pallets"]:
+            # รูปแบบพาเลทใช้แคชร่วมกับแผนอื่น (คีย์ต่างกัน) จึงใช้ซ้ำข้ามการคำนวณได้
+            *result, plan["pallet_summary"] = pack_palletized(
+                space_dim, max_weight, boxes, pallet=plan["pallet"], cache=plan_cache, progress=job.report, **options
+            )
+        elif plan["use_portfolio"]:
+            # แต่ละลำดับรันใน process แยก จึงรายงานความคืบหน้าได้เฉพาะตอนจบ
+            plan["best_order"], result, plan["portfolio_summary"] = run_portfolio(
+                space_dim, max_weight, boxes, objective=plan["objective"], time_budget=plan["time_budget"],
+                workers=plan["workers"], **options
+            )
+        elif plan["use_optimizer"]:
+            optimizer = AnytimeOptimizer(space_dim, max_weight, boxes, **options)
+            optimizer.cancelled = job.cancelled
+            result = optimizer.run(plan["time_budget"], on_improve=lambda o: job.report(o.best[0]), progress=job.report)
+            plan.update(initial_percent=optimizer.initial[1], iterations=optimizer.iterations,
+                        improvements=optimizer.improvements)
+        elif incremental is not None:
+            # แคชใช้ร่วมกันทุก session ถ้าไม่เจอค่อยจัดแบบ incremental ของ session นี้
+            plan_key = manifest_key(space_dim, max_weight, boxes, **options)
+            with profiler.phase("cache_lookup"):
+                result = plan_cache.get(plan_key)
+            if result is None:
+                result = incremental.pack(boxes, profiler=profiler, progress=job.report)
+                plan.update(reused=incremental.reused, box_types=len(incremental.boxes))
+                if not job.cancelled.is_set():
+                    plan_cache.put(plan_key, result)
+        else:
+            result = cached_pack_boxes(plan_cache, space_dim, max_weight, boxes, profiler=profiler,
+                                       progress=job.report, **options)
+            plan["cache_stats"] = (plan_cache.hits, plan_cache.misses)
+    plan["placements"], plan["used_percent"], plan["total_weight"] = result
+    plan["cancelled"] = job.cancelled.is_set()
+    return plan
+
+
+@st.fragment(run_every=PROGRESS_REFRESH)
+def show_progress(job):
+    # รันซ้ำเองทุก PROGRESS_REFRESH วินาทีระหว่างที่งานยังไม่เสร็จ ส่วนอื่นของหน้าใช้งานได้ตามปกติ
+    if not job.running:
+        st.rerun()
+    snapshot, used_percent = job.latest()
+    st.progress(min(job.placed / max(job.total_units, 1), 1.0),
+                text=f"⏳ กำลังจัด... วางแล้ว {job.placed} / {job.total_units} กล่อง · "
+                     f"ใช้พื้นที่ {used_percent:.2f}% · {job.elapsed():.1f} วินาที")
+    if st.button("⏹️ ยกเลิกการคำนวณ", key="cancel_packing"):
+        job.cancel()
+    if snapshot is not None and len(snapshot):
+        st.plotly_chart(box_figure(snapshot, "แผนระหว่างจัด", lod_threshold=LOD_THRESHOLD), key="progress_chart")
+
+
+def show_plan(plan, profiler=NULL_PROFILER, key=None):
+    packed_boxes, used_percent, total_weight = plan["placements"], plan["used_percent"], plan["total_weight"]
+    space_dim, max_weight, axles = plan["space_dim"], plan["max_weight"], plan["axles"]
+
+    st.subheader(" สรุปผลการจัดวาง")
+    if plan["cancelled"]:
+        st.warning("⚠️ ยกเลิกการคำนวณแล้ว แสดงแผนเท่าที่จัดได้ก่อนยกเลิก")
+    st.write(f" พื้นที่ที่ใช้: **{used_percent:.2f}%**")
+    st.write(f" น้ำหนักรวมกล่อง: **{total_weight:.2f} กก.** / จำกัดสูงสุด {max_weight} กก.")
+    cog = center_of_gravity(packed_boxes)
+    if cog is not None:
+        st.write(f" จุดศูนย์ถ่วง (กว้าง, ยาว, สูง): **{cog[0]:.0f}, {cog[1]:.0f}, {cog[2]:.0f} cm** "
+                 f"(เยื้องจากกึ่งกลางด้านข้าง {cog[0] - space_dim[0] / 2:+.0f} cm)")
+    if axles is not None:
+        front_load, rear_load = axle_loads(packed_boxes, axles)
+        st.write(f" น้ำหนักลงเพลาหน้า: **{front_load:.0f}** / {axles['front_max']:.0f} กก. · "
+                 f"เพลาหลัง: **{rear_load:.0f}** / {axles['rear_max']:.0f} กก.")
+    if plan["use_pallets"]:
+        pallet_summary = plan["pallet_summary"]
+        pallets_needed = sum(row["needed"] for row in pallet_summary if row["pallet"])
+        pallets_loaded = sum(row["loaded"] for row in pallet_summary if row["pallet"])
+        st.write(f" จัดพาเลทลงได้ **{pallets_loaded}** / {pallets_needed} พาเลท")
+        with st.expander("รูปแบบพาเลท"):
+            st.dataframe([
+                {
+                    "รูปแบบ": "พาเลท" if row["pallet"] else "กล่องเดี่ยว (ใหญ่เกินพาเลท)",
+                    "กล่องบนพาเลท": ", ".join(f"{box_id} × {count}" for box_id, count in row["boxes"].items()),
+                    "ต้องใช้": row["needed"],
+                    "จัดได้": row["loaded"],
+                    "สูงรวม (cm)": round(row["height"], 1),
+                    "น้ำหนักต่อหน่วย (กก.)": round(row["weight"], 2),
+                }
+                for row in pallet_summary
+            ])
+    elif plan["use_portfolio"]:
+        st.write(f" ลำดับที่ดีที่สุด: **{plan['best_order']}** (ลองแล้ว {len(plan['portfolio_summary'])} แบบ)")
+        with st.expander("ผลของทุกลำดับ"):
+            st.dataframe(plan["portfolio_summary"])
+    elif plan["use_optimizer"]:
+        st.write(f" ปรับปรุงจาก {plan['initial_percent']:.2f}% เป็น **{used_percent:.2f}%** "
+                 f"(ลอง {plan['iterations']} แบบ ดีขึ้น {plan['improvements']} ครั้ง)")
+    elif "reused" in plan:
+        st.caption(f"จัดใหม่ตั้งแต่ประเภทกล่องที่ {plan['reused'] + 1} จาก {plan['box_types']} "
+                   f"(ใช้ผลเดิม {plan['reused']} ประเภท)")
+    elif "cache_stats" in plan:
+        st.caption("แคชผลการจัดวาง: hit {} / miss {}".format(*plan["cache_stats"]))
+
+    if plan["multi_drop"]:
+        stops = rehandling_moves(packed_boxes, plan["boxes"])
+        st.write(f" ประมาณการย้ายกล่องที่ขวางทางรวม: **{sum(s['moves'] for s in stops)}** ครั้ง")
+        st.dataframe([{"จุดส่ง": s["stop"], "จำนวนกล่อง": s["boxes"], "กล่องที่ต้องย้ายก่อน": s["moves"]} for s in stops])
+
+    if total_weight > max_weight:
+        st.warning("⚠️ น้ำหนักรวมเกินขีดจำกัด กรุณาปรับขนาดหรือน้ำหนักกล่อง")
+
+    if check_plan(packed_boxes, space_dim, max_weight, total_weight, profiler):
+        visualize_boxes(packed_boxes, key=key, profiler=profiler)
+
+    # สร้างไฟล์ตอนกดดาวน์โหลดเท่านั้น
+    view = key or "chart"
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            "💾 บันทึกแผน (.plan)", key=f"{view}_save_plan", on_click="ignore", file_name="packing.plan",
+            mime="application/octet-stream",
+            data=lambda: plan_bytes(packed_boxes, space_dim, max_weight, total_weight, plan["boxes"],
+                                    used_percent=used_percent, axles=axles, multi_drop=plan["multi_drop"],
+                                    strategy=plan.get("strategy"), cancelled=plan["cancelled"]),
+        )
+    with col2:
+        st.download_button("🧊 ส่งออกโมเดล 3 มิติ (.glb)", key=f"{view}_export_glb", on_click="ignore",
+                           file_name="packing.glb", mime="model/gltf-binary",
+                           data=lambda: glb_bytes(packed_boxes, space_dim))
+
+
+def saved_plan(data):
+    # แผนจากไฟล์ .plan ในรูปแบบเดียวกับผลของ compute_plan (ไม่มีรายละเอียดเฉพาะวิธีจัด)
+    placements, header = load_plan(data)
+    return {
+        "placements": placements, "used_percent": header.get("used_percent", 0.0),
+        "total_weight": header["total_weight"], "space_dim": tuple(header["space"]),
+        "max_weight": header["max_weight"], "axles": header.get("axles"),
+        "multi_drop": header.get("multi_drop", False), "boxes": header["boxes"], "strategy": header.get("strategy"),
+        "cancelled": header.get("cancelled", False), "use_pallets": False, "use_portfolio": False,
+        "use_optimizer": False,
+    }
+
+
+st.sidebar.subheader("🩺 วินิจฉัยความเร็ว")
+profiling_on = st.sidebar.checkbox("จับเวลาแต่ละขั้นตอน")
+metrics_log = st.sidebar.text_input("บันทึกผลต่อท้ายไฟล์ (JSONL)", value="", disabled=not profiling_on)
+profiler = Profiler(enabled=profiling_on)
+
+st.sidebar.subheader("📂 แผนที่บันทึกไว้")
+plan_file = st.sidebar.file_uploader("เปิดไฟล์แผน (.plan)", type=["plan"])
 
 
 st.title("📦 ระบบจำลองการวางกล่อง")
@@ -131,42 +295,273 @@ else:
     """)
 
 
-st.subheader(" ข้อมูลกล่องสินค้า")
-
-boxes = []
-box_count = st.number_input("ระบุจำนวนกล่องที่ต้องการเพิ่ม", min_value=1, max_value=20, value=3)
-
-for i in range(box_count):
-    st.markdown(f"### กล่องที่ {i+1}")
-    col1, col2, col3 = st.columns(3)
+axle_mode = st.checkbox("⚖️ จำกัดน้ำหนักลงเพลาหน้า / เพลาหลัง")
+if axle_mode:
+    st.caption("ตำแหน่งวัดตามความยาวจากหน้ากระบะ (เพลาหน้าใต้หัวเก๋งใส่ค่าติดลบ) น้ำหนักคิดเฉพาะสินค้า")
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
-        width = st.number_input(f"กว้าง (cm) กล่อง {i+1}", key=f"w_{i}", min_value=1, value=40)
+        front_axle_y = st.number_input("เพลาหน้า (cm)", value=-100)
     with col2:
-        length = st.number_input(f"ยาว (cm) กล่อง {i+1}", key=f"l_{i}", min_value=1, value=60)
+        rear_axle_share = st.number_input("เพลาหลัง (% ของความยาว)", min_value=1, max_value=100, value=75)
     with col3:
-        height = st.number_input(f"สูง (cm) กล่อง {i+1}", key=f"h_{i}", min_value=1, value=40)
+        front_axle_share = st.number_input("เพลาหน้ารับได้ (% น้ำหนักบรรทุก)", min_value=1, max_value=100, value=40)
+    with col4:
+        rear_axle_share_max = st.number_input("เพลาหลังรับได้ (% น้ำหนักบรรทุก)", min_value=1, max_value=100, value=75)
+
+
+def axle_limits(length, payload):
+    if not axle_mode:
+        return None
+    return {
+        "front_y": front_axle_y,
+        "rear_y": length * rear_axle_share / 100,
+        "front_max": payload * front_axle_share / 100,
+        "rear_max": payload * rear_axle_share_max / 100,
+    }
 
-    weight = st.number_input(f"น้ำหนัก (kg) กล่อง {i+1}", key=f"wt_{i}", min_value=1, value=10)
-    qty = st.number_input(f"จำนวนกล่อง {i+1}", key=f"qty_{i}", min_value=1, value=1)
 
-    boxes.append({
-        "id": chr(65+i),
-        "width": width,
-        "length": length,
-        "height": height,
-        "weight": weight,
-        "quantity": qty
-    })
+axles = axle_limits(space_l, max_weight)
 
 
-if st.button(" คำนวณการจัดวางกล่อง"):
-    packed_boxes, used_percent, total_weight = pack_boxes(space_w, space_l, space_h, max_weight, boxes)
+if mode == " รถบรรทุก":
+    catalog = {
+        name: {"width": space_w, "length": space_l, "height": space_h, "max_weight": data["max_weight"]}
+        for name, data in truck_types.items()
+    }
+else:
+    catalog = {
+        name: {"width": data["width"], "length": data["length"], "height": data["height"], "max_weight": 28000}
+        for name, data in containers.items()
+    }
 
-    st.subheader(" สรุปผลการจัดวาง")
-    st.write(f" พื้นที่ที่ใช้: **{used_percent:.2f}%**")
-    st.write(f" น้ำหนักรวมกล่อง: **{total_weight:.2f} กก.** / จำกัดสูงสุด {max_weight} กก.")
+fleet_mode = st.checkbox("🚛 แบ่งสินค้าลงหลายคัน / หลายตู้ เมื่อคันเดียวไม่พอ")
+recommend_mode = st.checkbox("🔎 แนะนำรถ / ตู้ที่เล็กที่สุดที่รับสินค้าได้หมดในคันเดียว", disabled=fleet_mode)
+if fleet_mode:
+    st.markdown("จำนวนรถ / ตู้ที่มีให้ใช้")
+    fleet = []
+    for name, spec in catalog.items():
+        count = st.number_input(f"จำนวน {name}", key=f"fleet_{name}", min_value=0, value=1)
+        fleet.append({"name": name, **spec, "count": count, "axles": axle_limits(spec["length"], spec["max_weight"])})
 
-    if total_weight > max_weight:
-        st.warning("⚠️ น้ำหนักรวมเกินขีดจำกัด กรุณาปรับขนาดหรือน้ำหนักกล่อง")
 
-    visualize_boxes(packed_boxes)
+st.subheader(" ข้อมูลกล่องสินค้า")
+
+rotation_options = {
+    "หมุนได้ทุกทิศ": "all",
+    "ตั้งขึ้นเท่านั้น (this side up)": "upright",
+    "ห้ามหมุน": "fixed",
+}
+rotation_labels = {value: label for label, value in rotation_options.items()}
+
+default_manifest = pd.DataFrame([
+    {"id": box_id, "width": 40, "length": 60, "height": 40, "weight": 10, "quantity": 1, "rotation": "all", "stop": 1}
+    for box_id in "ABC"
+])
+
+manifest_file = st.file_uploader("📄 นำเข้ารายการกล่องจากไฟล์ (CSV / Excel)", type=["csv", "xlsx"])
+st.caption("คอลัมน์ที่ต้องมี: id, width, length, height, weight, quantity และ rotation (fixed / upright / all), "
+           "stop (ลำดับจุดส่ง) ถ้ามี ไม่มี rotation ถือเป็น all")
+
+if manifest_file is not None:
+    try:
+        boxes, manifest_errors, error_count = load_manifest(manifest_file.getvalue(), manifest_file.name)
+    except ValueError as e:
+        st.error(f"อ่านไฟล์ไม่ได้: {e}")
+        boxes, manifest_errors, error_count = [], [], 0
+    st.success(f"นำเข้า {len(boxes)} รายการ รวม {sum(b['quantity'] for b in boxes)} กล่อง")
+    if error_count:
+        st.warning(f"⚠️ ข้ามแถวที่ข้อมูลไม่ถูกต้อง {error_count} แถว")
+        with st.expander("ดูแถวที่ผิดพลาด"):
+            st.dataframe([{"แถว": row, "สาเหตุ": reason} for row, reason in manifest_errors])
+else:
+    # ตารางเดียวใน form: แก้ได้ทั้งตารางแล้วคำนวณใหม่ครั้งเดียวตอนกดยืนยัน
+    with st.form("manifest_form"):
+        manifest_table = st.data_editor(
+            default_manifest,
+            num_rows="dynamic",
+            hide_index=True,
+            key="manifest_editor",
+            column_config={
+                "id": st.column_config.TextColumn("รหัสกล่อง", required=True),
+                "width": st.column_config.NumberColumn("กว้าง (cm)", min_value=1, default=40, required=True),
+                "length": st.column_config.NumberColumn("ยาว (cm)", min_value=1, default=60, required=True),
+                "height": st.column_config.NumberColumn("สูง (cm)", min_value=1, default=40, required=True),
+                "weight": st.column_config.NumberColumn("น้ำหนัก (kg)", min_value=0, default=10, required=True),
+                "quantity": st.column_config.NumberColumn("จำนวน", min_value=1, step=1, default=1, required=True),
+                "rotation": st.column_config.SelectboxColumn("การหมุน", options=list(rotation_options.values()),
+                                                             format_func=rotation_labels.get, default="all",
+                                                             required=True),
+                "stop": st.column_config.NumberColumn("จุดส่งที่", min_value=1, step=1, default=1),
+            },
+        )
+        st.form_submit_button("✔️ ใช้รายการกล่องนี้")
+
+    boxes, manifest_errors, error_count = read_table(manifest_table)
+    if error_count:
+        st.warning(f"⚠️ ข้ามแถวที่ข้อมูลไม่ครบหรือไม่ถูกต้อง {error_count} แถว")
+        with st.expander("ดูแถวที่ผิดพลาด"):
+            st.dataframe([{"แถว": row, "สาเหตุ": reason} for row, reason in manifest_errors])
+
+
+strategy_options = {
+    "จัดเรียงทีละแถว (แบบเดิม)": "cursor",
+    "ค้นหาพื้นที่ว่างที่เหลือ (maximal space)": "maximal_space",
+}
+strategy = strategy_options[st.selectbox("🧩 วิธีจัดวางกล่อง", list(strategy_options.keys()))]
+
+multi_drop = st.checkbox("📍 ส่งหลายจุด: ของจุดส่งแรกอยู่ใกล้ประตูท้าย (จุดสุดท้ายเข้าก่อน)")
+
+use_pallets = st.checkbox("🪵 จัดกล่องลงพาเลทก่อน แล้วจัดพาเลทลงรถ")
+if use_pallets:
+    pallet_choice = st.selectbox("ขนาดพาเลท", list(PALLETS.keys()), format_func=lambda name: (
+        f"{name} ({PALLETS[name]['width']} x {PALLETS[name]['length']} cm, "
+        f"รับได้ {PALLETS[name]['max_load']} กก. สูงรวม {PALLETS[name]['max_height']} cm)"))
+
+use_portfolio = st.checkbox("🔀 ลองหลายลำดับการจัดพร้อมกันแล้วเลือกแผนที่ดีที่สุด", disabled=use_pallets)
+if use_portfolio:
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        portfolio_objective = st.selectbox("เป้าหมาย", ["utilization", "weight"],
+                                           format_func={"utilization": "ใช้พื้นที่มากที่สุด", "weight": "บรรทุกน้ำหนักมากที่สุด"}.get)
+    with col2:
+        portfolio_budget = st.number_input("เวลาสูงสุด (วินาที)", min_value=0.5, max_value=60.0, value=2.0, step=0.5)
+    with col3:
+        portfolio_workers = st.number_input("จำนวน worker", min_value=1, max_value=64, value=os.cpu_count() or 1)
+
+use_optimizer = st.checkbox("🔥 ปรับปรุงแผนต่อด้วยการสลับลำดับ / ทิศของกล่อง (local search)",
+                            disabled=use_portfolio or use_pallets)
+if use_optimizer:
+    optimizer_budget = st.number_input("เวลาที่ใช้ปรับปรุง (วินาที)", min_value=0.5, max_value=120.0, value=2.0,
+                                       step=0.5)
+
+calculate = st.button(" คำนวณการจัดวางกล่อง")
+
+if calculate and fleet_mode:
+    with profiler.phase("compute"):
+        loads, leftover = pack_fleet(fleet, boxes, strategy=strategy)
+
+    st.subheader(" สรุปผลการจัดวางหลายคัน")
+    st.write(f" ใช้ทั้งหมด **{len(loads)}** คัน/ตู้")
+    st.dataframe([
+        {
+            "คันที่": n + 1,
+            "ประเภท": load["vehicle"],
+            "จำนวนกล่อง": len(load["placements"]),
+            "พื้นที่ที่ใช้ (%)": round(load["used_percent"], 2),
+            "น้ำหนัก (กก.)": round(load["total_weight"], 2),
+            "จำกัดสูงสุด (กก.)": load["max_weight"],
+            "จุดศูนย์ถ่วงตามความยาว (cm)": round(cog[1]) if (cog := center_of_gravity(load["placements"])) else None,
+        }
+        for n, load in enumerate(loads)
+    ])
+
+    if leftover:
+        st.warning("⚠️ รถ/ตู้ที่มีไม่พอสำหรับกล่องต่อไปนี้: " +
+                   ", ".join(f"{box['id']} × {box['quantity']}" for box in leftover))
+
+    if loads:
+        tabs = st.tabs([f"คันที่ {n + 1}" for n in range(len(loads))])
+        for n, load in enumerate(loads):
+            with tabs[n]:
+                spec = catalog[load["vehicle"]]
+                if check_plan(load["placements"], (spec["width"], spec["length"], spec["height"]),
+                              load["max_weight"], load["total_weight"], profiler):
+                    visualize_boxes(load["placements"], key=f"fleet_chart_{n}", profiler=profiler)
+
+elif calculate and recommend_mode:
+    vehicles = [{"name": name, **spec, "axles": axle_limits(spec["length"], spec["max_weight"])}
+                for name, spec in catalog.items()]
+    with profiler.phase("compute"), st.spinner("กำลังเทียบรถ / ตู้ทุกประเภท..."):
+        chosen, result, recommend_report = recommend_vehicle(vehicles, boxes, strategy=strategy)
+
+    st.subheader(" ผลการแนะนำรถ / ตู้")
+    status_labels = {"ruled_out": "ตัดออก (รับไม่ได้แน่นอน)", "fits": "รับได้หมด", "does_not_fit": "จัดแล้วไม่หมด",
+                     "skipped": "ไม่ต้องจัด (มีคันที่เล็กกว่ารับได้)"}
+    st.dataframe([
+        {
+            "ประเภท": row["vehicle"],
+            "ผล": status_labels[row["status"]],
+            "เหตุผล": row["reason"],
+            "จำนวนกล่องที่จัดได้": row["packed"],
+            "พื้นที่ที่ใช้ (%)": round(row["used_percent"], 2) if row["used_percent"] is not None else None,
+        }
+        for row in recommend_report
+    ])
+    if chosen is None:
+        st.warning("⚠️ ไม่มีรถ / ตู้คันเดียวที่รับสินค้าได้หมด ลองใช้โหมดแบ่งหลายคัน")
+    else:
+        vehicle = vehicles[chosen]
+        packed_boxes, used_percent, total_weight, _ = result
+        st.success(f"แนะนำ **{vehicle['name']}** ใช้พื้นที่ {used_percent:.2f}% น้ำหนัก {total_weight:.2f} กก.")
+        if check_plan(packed_boxes, (vehicle["width"], vehicle["length"], vehicle["height"]), vehicle["max_weight"],
+                      total_weight, profiler):
+            visualize_boxes(packed_boxes, key="recommend_chart", profiler=profiler)
+
+elif calculate:
+    # งานเดิมของ session ที่ยังรันอยู่ต้องหยุดก่อน เพราะใช้ IncrementalPacker ตัวเดียวกัน
+    previous = st.session_state.get("packing_job")
+    if previous is not None and previous.running:
+        previous.cancel()
+        previous.join()
+    plan = {
+        "space_dim": (space_w, space_l, space_h), "max_weight": max_weight, "boxes": boxes, "strategy": strategy,
+        "axles": axles, "multi_drop": multi_drop, "use_pallets": use_pallets, "use_portfolio": use_portfolio,
+        "use_optimizer": use_optimizer, "profiler": profiler,
+    }
+    if use_pallets:
+        plan["pallet"] = pallet_choice
+    elif use_portfolio:
+        plan.update(objective=portfolio_objective, time_budget=portfolio_budget, workers=portfolio_workers)
+    elif use_optimizer:
+        plan["time_budget"] = optimizer_budget
+    # อ่านจาก st.* ใน thread หลักเท่านั้น worker ไม่มี ScriptRunContext
+    incremental = None
+    if strategy == "maximal_space" and not (use_pallets or use_portfolio or use_optimizer):
+        incremental = get_incremental_packer(plan["space_dim"], max_weight, axles, multi_drop)
+    st.session_state["packing_job"] = PackingJob(
+        partial(compute_plan, plan=plan, plan_cache=get_plan_cache(), incremental=incremental),
+        plan["space_dim"], sum(b["quantity"] for b in boxes)
+    ).start()
+
+job = st.session_state.get("packing_job")
+shown_job = None
+if job is not None and not (fleet_mode or recommend_mode):
+    if job.running:
+        show_progress(job)
+    elif job.error is not None:
+        st.error(f"คำนวณไม่สำเร็จ: {job.error}")
+    else:
+        show_plan(job.result, profiler)
+        shown_job = job
+
+if plan_file is not None:
+    st.divider()
+    st.markdown(f"**📂 แผนจากไฟล์ {plan_file.name}**")
+    try:
+        opened_plan = saved_plan(plan_file.getvalue())
+    except (ValueError, KeyError) as e:
+        st.error(f"เปิดไฟล์แผนไม่ได้: {e}")
+    else:
+        show_plan(opened_plan, profiler, key="opened_plan")
+
+if (calculate or shown_job is not None) and profiler.enabled:
+    if shown_job is not None and shown_job.result["profiler"].enabled:
+        # ขั้นตอนการจัดวัดใน worker ส่วนตรวจแผน/วาดภาพวัดในรอบนี้
+        packing_profiler = shown_job.result["profiler"]
+        profiler.timings = {**packing_profiler.timings, **profiler.timings}
+        profiler.counters = {**packing_profiler.counters, **profiler.counters}
+    report = profiler.report()
+    st.sidebar.markdown("**เวลาแต่ละขั้นตอน (ms)**")
+    st.sidebar.dataframe([{"ขั้นตอน": name, "ms": round(ms, 2)} for name, ms in report["timings_ms"].items()])
+    st.sidebar.markdown("**ตัวนับ**")
+    st.sidebar.dataframe([{"รายการ": name, "จำนวน": value} for name, value in report["counters"].items()])
+    # งานเบื้องหลังบันทึกครั้งเดียวตอนแสดงผลครั้งแรก
+    if metrics_log and (shown_job is None or not shown_job.result.get("logged")):
+        try:
+            profiler.append_log(metrics_log, strategy=strategy, fleet=fleet_mode, portfolio=use_portfolio,
+                                box_types=len(boxes), units=sum(b["quantity"] for b in boxes))
+            if shown_job is not None:
+                shown_job.result["logged"] = True
+            st.sidebar.caption(f"บันทึกลง {metrics_log} แล้ว")
+        except OSError as e:
+            st.sidebar.error(f"บันทึกไม่ได้: {e}")
@@ -0,0 +1,75 @@
+import threading
+import time
+
+from packing import calculate_volume
+
+# -----------------------------
+# งานจัดกล่องเบื้องหลัง
+# -----------------------------
+# รันการจัดใน thread แยกจากการรันสคริปต์ของ Streamlit เพื่อให้หน้าเว็บตอบสนองได้ระหว่างคำนวณ
+# ตัวจัดเรียก job.report(placements) หลังวางกล่อง/ก้อนแต่ละครั้ง (ส่งเป็น progress= ของ pack_boxes)
+# และหยุดเมื่อได้ False กลับมา (ถูกยกเลิก) แล้วคืนแผนเท่าที่วางได้
+# สำเนาแผนระหว่างทาง (snapshot) ทำไม่บ่อยกว่าทุก SNAPSHOT_INTERVAL วินาที เพราะต้องคัดลอกทุกแถว
+
+SNAPSHOT_INTERVAL = 0.5
+
+
+class PackingJob:
+    def __init__(self, target, space_dim, total_units):
+        # target(job) คืนผลลัพธ์ของงาน เก็บไว้ที่ .result (หรือ exception ที่ .error)
+        self.target = target
+        self.space_volume = calculate_volume(*space_dim)
+        self.total_units = total_units
+        self.cancelled = threading.Event()
+        self.placed = 0
+        self.used_percent = 0.0
+        self.snapshot = None
+        self.result = None
+        self.error = None
+        self.started = None
+        self.finished = None
+        self._last_snapshot = 0.0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.started = time.monotonic()
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            self.result = self.target(self)
+        except Exception as e:
+            # ส่งต่อให้หน้าเว็บแสดง แทนที่ thread จะจบเงียบ ๆ
+            self.error = e
+        finally:
+            self.finished = time.monotonic()
+
+    def report(self, placements):
+        self.placed = len(placements)
+        now = time.monotonic()
+        if now - self._last_snapshot >= SNAPSHOT_INTERVAL:
+            self._last_snapshot = now
+            snapshot = placements.copy()
+            used_percent = snapshot.used_volume() / self.space_volume * 100
+            with self._lock:
+                self.snapshot, self.used_percent = snapshot, used_percent
+        return not self.cancelled.is_set()
+
+    def latest(self):
+        with self._lock:
+            return self.snapshot, self.used_percent
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    @property
+    def running(self):
+        return self.started is not None and self.finished is None
+
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
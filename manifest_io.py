@@ -0,0 +1,156 @@
+import os
+from zipfile import BadZipFile
+
+import numpy as np
+import pandas as pd
+
+from packing import ROTATIONS
+
+# -----------------------------
+# นำเข้ารายการกล่องจากไฟล์ CSV / Excel
+# -----------------------------
+# อ่านทีละช่วง (chunk) ตรวจชนิดข้อมูลแบบ vectorized แล้วรวมบรรทัดที่เหมือนกัน
+# ก่อนแปลงเป็น dict ของกล่องตามรูปแบบที่ pack_boxes ใช้
+
+REQUIRED_COLUMNS = ('id', 'width', 'length', 'height', 'weight', 'quantity')
+# ค่าที่ใช้เมื่อไม่มีคอลัมน์หรือช่องว่าง rotation ใช้ค่าเริ่มต้นเดียวกับตารางแก้ไขกล่องใน ihere.py
+OPTIONAL_COLUMNS = {'rotation': 'all', 'stop': '1'}
+CHUNK_ROWS = 50_000
+
+# เก็บรายละเอียดข้อผิดพลาดไว้แสดงไม่เกินจำนวนนี้ (แต่นับทั้งหมด)
+MAX_ERRORS = 1000
+
+# จำนวนกล่องต่อแถวและลำดับจุดส่งสูงสุด (ค่าที่ใหญ่กว่านี้เป็นข้อมูลผิด และจะล้นเมื่อแปลงเป็น int64)
+MAX_QUANTITY = 1_000_000
+MAX_STOP = 10_000
+
+
+def read_csv_chunks(source, chunksize):
+    for chunk in pd.read_csv(source, dtype=str, chunksize=chunksize, skipinitialspace=True,
+                             keep_default_na=False):
+        yield chunk
+
+def read_excel_chunks(source, chunksize):
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    # ไฟล์เสีย / ไม่ใช่ Excel แปลงเป็น ValueError เหมือนข้อผิดพลาดอื่นของไฟล์
+    # (zip เสีย, ไม่มีส่วนที่ต้องมีใน zip, XML ของชีตเสียซึ่งเป็น SyntaxError)
+    try:
+        # read_only อ่านทีละแถวโดยไม่โหลดทั้งชีตเข้าหน่วยความจำ
+        workbook = load_workbook(source, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            header = ['' if h is None else str(h) for h in header]
+            chunk = []
+            for row in rows:
+                chunk.append(['' if v is None else str(v) for v in row[:len(header)]])
+                if len(chunk) >= chunksize:
+                    yield pd.DataFrame(chunk, columns=header, dtype=str)
+                    chunk = []
+            if chunk:
+                yield pd.DataFrame(chunk, columns=header, dtype=str)
+        finally:
+            workbook.close()
+    except (BadZipFile, InvalidFileException, KeyError, OSError, SyntaxError) as e:
+        raise ValueError(f"not a valid Excel file: {e}") from e
+
+def validate_chunk(chunk, first_row):
+    # คืน DataFrame ของแถวที่ถูกต้อง และรายการ (เลขแถว, เหตุผล) ของแถวที่ผิด
+    chunk = chunk.rename(columns=lambda c: str(c).strip().lower())
+    missing = [c for c in REQUIRED_COLUMNS if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"missing columns: {', '.join(missing)}")
+
+    clean = pd.DataFrame(index=chunk.index)
+    clean['id'] = chunk['id'].str.strip()
+    problems = pd.Series('', index=chunk.index)
+    problems[clean['id'] == ''] = 'id is empty'
+
+    for column in ('width', 'length', 'height'):
+        clean[column] = pd.to_numeric(chunk[column].str.strip(), errors='coerce')
+        bad = ~((clean[column] > 0) & np.isfinite(clean[column]))
+        problems[bad & (problems == '')] = f"{column} must be a finite number > 0"
+
+    clean['weight'] = pd.to_numeric(chunk['weight'].str.strip(), errors='coerce')
+    problems[~((clean['weight'] >= 0) & np.isfinite(clean['weight'])) & (problems == '')] = \
+        "weight must be a finite number >= 0"
+
+    quantity = pd.to_numeric(chunk['quantity'].str.strip(), errors='coerce')
+    bad = ~((quantity >= 1) & (quantity <= MAX_QUANTITY)) | (quantity != np.floor(quantity))
+    problems[bad & (problems == '')] = f"quantity must be a whole number from 1 to {MAX_QUANTITY}"
+    clean['quantity'] = quantity.where(~bad, 0).astype('int64')
+
+    for column, default in OPTIONAL_COLUMNS.items():
+        if column in chunk.columns:
+            values = chunk[column].str.strip().str.lower().replace('', default)
+        else:
+            values = pd.Series(default, index=chunk.index)
+        clean[column] = values
+    problems[~clean['rotation'].isin(list(ROTATIONS)) & (problems == '')] = \
+        f"rotation must be one of {', '.join(ROTATIONS)}"
+
+    stop = pd.to_numeric(clean['stop'], errors='coerce')
+    bad = ~((stop >= 1) & (stop <= MAX_STOP)) | (stop != np.floor(stop))
+    problems[bad & (problems == '')] = f"stop must be a whole number from 1 to {MAX_STOP}"
+    clean['stop'] = stop.where(~bad, 0).astype('int64')
+
+    bad_rows = problems != ''
+    errors = [(first_row + int(n), reason) for n, reason in
+              zip(np.flatnonzero(bad_rows.to_numpy()), problems[bad_rows])]
+    return clean[~bad_rows], errors
+
+def read_manifest(source, filename=None, chunksize=CHUNK_ROWS):
+    # คืน (boxes, errors, error_count); เลขแถวของข้อผิดพลาดนับแบบในไฟล์ (หัวตารางคือแถว 1)
+    name = filename or (source if isinstance(source, str) else getattr(source, 'name', ''))
+    extension = os.path.splitext(str(name))[1].lower()
+    if extension in ('.xlsx', '.xlsm'):
+        chunks = read_excel_chunks(source, chunksize)
+    elif extension in ('.csv', '.txt', ''):
+        chunks = read_csv_chunks(source, chunksize)
+    else:
+        raise ValueError(f"unsupported manifest file type: {extension}")
+
+    parts = []
+    errors = []
+    error_count = 0
+    first_row = 2
+    for chunk in chunks:
+        valid, chunk_errors = validate_chunk(chunk.reset_index(drop=True), first_row)
+        first_row += len(chunk)
+        error_count += len(chunk_errors)
+        errors.extend(chunk_errors[:MAX_ERRORS - len(errors)])
+        if len(valid):
+            parts.append(valid)
+
+    return merge_rows(parts), errors, error_count
+
+def read_table(table):
+    # ตารางจาก st.data_editor (ค่าว่างเป็น None/NaN) เลขแถวของข้อผิดพลาดเริ่มที่ 1
+    chunk = table.reset_index(drop=True).astype(object).where(table.notna().to_numpy(), '').astype(str)
+    valid, errors = validate_chunk(chunk, 1)
+    return merge_rows([valid] if len(valid) else []), errors, len(errors)
+
+def merge_rows(parts):
+    if not parts:
+        return []
+
+    # SKU เดียวกันที่ขนาด/น้ำหนัก/การหมุนเหมือนกันรวมเป็นรายการเดียว
+    keys = ['id', 'width', 'length', 'height', 'weight', 'rotation', 'stop']
+    manifest = pd.concat(parts, ignore_index=True).groupby(keys, sort=False, as_index=False)['quantity'].sum()
+    return [
+        {
+            'id': row.id,
+            'width': float(row.width),
+            'length': float(row.length),
+            'height': float(row.height),
+            'weight': float(row.weight),
+            'quantity': int(row.quantity),
+            'rotation': row.rotation,
+            'stop': int(row.stop),
+        }
+        for row in manifest.itertuples(index=False)
+    ]
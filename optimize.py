@@ -0,0 +1,127 @@
+import math
+import random
+import threading
+import time
+
+from packing import orientations, pack_boxes, sort_boxes
+from portfolio import OBJECTIVES
+
+# -----------------------------
+# ปรับปรุงแผนต่อเนื่องภายในเวลาที่กำหนด (anytime)
+# -----------------------------
+# เริ่มจากผลของ pack_boxes แบบปกติ แล้วค้นหาเฉพาะที่ (simulated annealing) บนลำดับของรายการกล่อง
+# และการล็อกทิศของแต่ละรายการ ทุกคำตอบถูกถอดรหัสด้วย pack_boxes(order=None) แบบ bulk ซึ่งเร็ว
+# หยุดได้ทุกเมื่อ (หมดเวลา / cancel) แม้อยู่กลางการถอดรหัส เพราะ pack_boxes ถาม progress หลังวางแต่ละก้อน
+# แผนแรกนับรวมในเวลาที่กำหนด และอ่านแผนที่ดีที่สุดจนถึงตอนนี้ได้จาก .best หลังแผนแรกเสร็จ
+
+# อุณหภูมิเริ่มต้นและสุดท้าย (หน่วยเดียวกับคะแนนหลัก เช่น % พื้นที่)
+START_TEMPERATURE = 1.0
+END_TEMPERATURE = 0.01
+
+
+def decode(boxes, pins):
+    # รายการที่ล็อกทิศจะถูกหมุนให้ขนาดตรงกับทิศนั้นและห้ามหมุนต่อ
+    decoded = []
+    for box, pin in zip(boxes, pins):
+        if pin is not None:
+            w, l, h = orientations(box)[pin]
+            box = dict(box, width=w, length=l, height=h, rotation='fixed')
+        decoded.append(box)
+    return decoded
+
+
+class AnytimeOptimizer:
+    def __init__(self, space_dim, max_weight, boxes, strategy='maximal_space', objective='utilization', seed=0,
+                 **options):
+        self.space_dim = space_dim
+        self.max_weight = max_weight
+        self.strategy = strategy
+        self.score = OBJECTIVES[objective]
+        self.options = options
+        self.random = random.Random(seed)
+        self.cancelled = threading.Event()
+        self.iterations = 0
+        self.improvements = 0
+
+        self.current = (sort_boxes(boxes, options.pop('order', 'volume')), [None] * len(boxes))
+        # แผนแรกจัดใน run() จึงยังไม่มีผล
+        self.current_result = self.initial = self.best = None
+        self.best_boxes = decode(*self.current)
+
+    def evaluate(self, boxes, pins, deadline=None, progress=None):
+        # คืน (ผล, หยุดกลางทางหรือไม่) หยุดเมื่อถูกยกเลิก เลย deadline หรือ progress คืน False ผลจึงเป็นแผนบางส่วน
+        stopped = False
+
+        def keep_going(placements):
+            nonlocal stopped
+            stopped = self.cancelled.is_set() or (deadline is not None and time.monotonic() >= deadline)
+            if not stopped and progress is not None:
+                stopped = not progress(placements)
+            return not stopped
+
+        result = pack_boxes(self.space_dim, self.max_weight, decode(boxes, pins), strategy=self.strategy,
+                            order=None, progress=keep_going, **self.options)
+        return result, stopped
+
+    def neighbor(self):
+        boxes, pins = list(self.current[0]), list(self.current[1])
+        n = len(boxes)
+        move = self.random.random()
+        if n > 1 and move < 0.4:
+            i, j = self.random.sample(range(n), 2)
+            boxes[i], boxes[j] = boxes[j], boxes[i]
+            pins[i], pins[j] = pins[j], pins[i]
+        elif n > 1 and move < 0.7:
+            i, j = self.random.sample(range(n), 2)
+            boxes.insert(j, boxes.pop(i))
+            pins.insert(j, pins.pop(i))
+        else:
+            i = self.random.randrange(n)
+            choices = len(orientations(boxes[i]))
+            pins[i] = self.random.choice([None] + list(range(choices)))
+        return boxes, pins
+
+    def run(self, time_budget=2.0, on_improve=None, progress=None):
+        # คืนแผนที่ดีที่สุด (placements, used_percent, total_weight)
+        # progress(placements): ส่งต่อให้ pack_boxes ระหว่างจัดแผนแรก (ดู jobs.py)
+        # ถ้าแผนแรกเสร็จเมื่อหมดเวลาแล้วก็ไม่ค้นหาต่อ
+        started = time.monotonic()
+        deadline = started + time_budget
+        if self.best is None:
+            # แผนแรกต้องมีเสมอ จึงไม่ตัดด้วยเวลา ถูกยกเลิกกลางทางก็ใช้แผนบางส่วนนั้นเป็นผล
+            self.current_result, _ = self.evaluate(*self.current, progress=progress)
+            self.initial = self.best = self.current_result
+            if on_improve is not None:
+                on_improve(self)
+        while self.current[0] and not self.cancelled.is_set():
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            elapsed = (now - started) / time_budget if time_budget > 0 else 1.0
+            temperature = START_TEMPERATURE * (END_TEMPERATURE / START_TEMPERATURE) ** elapsed
+
+            candidate = self.neighbor()
+            result, stopped = self.evaluate(*candidate, deadline)
+            if stopped:
+                break
+            self.iterations += 1
+            delta = self.score(result)[0] - self.score(self.current_result)[0]
+            if self.score(result) >= self.score(self.current_result) or \
+                    self.random.random() < math.exp(delta / temperature):
+                self.current, self.current_result = candidate, result
+                if self.score(result) > self.score(self.best):
+                    self.best = result
+                    self.best_boxes = decode(*candidate)
+                    self.improvements += 1
+                    if on_improve is not None:
+                        on_improve(self)
+        return self.best
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+def optimize_pack(space_dim, max_weight, boxes, time_budget=2.0, strategy='maximal_space', objective='utilization',
+                  seed=0, **options):
+    return AnytimeOptimizer(space_dim, max_weight, boxes, strategy=strategy, objective=objective, seed=seed,
+                            **options).run(time_budget)
@@ -0,0 +1,639 @@
+import math
+
+import numpy as np
+
+from balance import LoadBalance
+from heightmap import EPSILON, HeightMap
+from placements import Placements
+from profiling import NULL_PROFILER
+
+# -----------------------------
+# ฟังก์ชันการคำนวณการจัดวางกล่อง
+# -----------------------------
+STRATEGIES = ('cursor', 'maximal_space')
+
+# สัดส่วนพื้นที่ฐานขั้นต่ำที่ต้องมีกล่องรองรับอยู่ด้านล่าง
+MIN_SUPPORT = 0.8
+
+# ขนาดช่องของแผนที่ความสูง (ซม.) ที่ใช้ตรวจการรองรับ None คือเลือกจากขนาดกล่อง (ดู grid_resolution)
+GRID_RESOLUTION = None
+
+
+def calculate_volume(w, l, h):
+    return w * l * h
+
+# ลำดับการหยิบกล่องเข้าจัด (มากไปน้อย); order=None คือใช้ลำดับตามที่ส่งมา
+ORDERINGS = {
+    'volume': lambda b: calculate_volume(b['width'], b['length'], b['height']),
+    'base_area': lambda b: b['width'] * b['length'],
+    'longest_edge': lambda b: max(b['width'], b['length'], b['height']),
+    'weight': lambda b: b['weight'],
+    'density': lambda b: b['weight'] / calculate_volume(b['width'], b['length'], b['height']),
+}
+
+def sort_boxes(boxes, order='volume', by_stop=False):
+    boxes = list(boxes) if order is None else sorted(boxes, key=ORDERINGS[order], reverse=True)
+    if by_stop:
+        # ส่งหลายจุด: ของจุดส่งสุดท้ายเข้าก่อน (ลึกสุด) sorted คงลำดับเดิมภายในจุดส่งเดียวกัน
+        boxes.sort(key=stop_of, reverse=True)
+    return boxes
+
+def stop_of(box):
+    # ลำดับจุดส่ง (1 คือจุดแรก) ไม่ระบุถือเป็นจุดแรก
+    return box.get('stop', 1)
+
+# การหมุนที่อนุญาตต่อกล่อง (box['rotation']) เป็นลำดับของแกน (กว้าง, ยาว, สูง)
+# 'fixed' วางตามที่กำหนดเท่านั้น, 'upright' หมุนได้รอบแกนตั้ง (ห้ามคว่ำ), 'all' ได้ทั้ง 6 ทิศ
+ROTATIONS = {
+    'fixed': ((0, 1, 2),),
+    'upright': ((0, 1, 2), (1, 0, 2)),
+    'all': ((0, 1, 2), (1, 0, 2), (0, 2, 1), (2, 0, 1), (1, 2, 0), (2, 1, 0)),
+}
+
+def orientations(box):
+    # ขนาด (w, l, h) ที่วางได้ ตัดแบบที่ซ้ำกันออก เช่นกล่องลูกบาศก์เหลือแบบเดียว
+    dims = (box['width'], box['length'], box['height'])
+    return list(dict.fromkeys(tuple(dims[i] for i in axes) for axes in ROTATIONS[box.get('rotation', 'fixed')]))
+
+def pack_boxes(space_dim, max_weight, boxes, strategy='cursor', bulk=True, order='volume',
+               resolution=GRID_RESOLUTION, profiler=NULL_PROFILER, axles=None, multi_drop=False, progress=None):
+    # bulk: วางกล่องชนิดเดียวกันเป็นก้อน (ค่าปกติ) bulk=False วางทีละใบ ช้ากว่าและมักได้พื้นที่น้อยกว่า
+    #       ใช้เป็นทางเลือกสำรอง/เทียบผลเท่านั้น ทีละใบลองมุมของพื้นที่ว่างก่อน แล้วจึงตำแหน่งภายในพื้นที่ (ดู SpacePacker.settle)
+    # axles: ขีดจำกัดน้ำหนักลงเพลา (ดู balance.py) None คือไม่ตรวจ
+    # multi_drop: จัดตามจุดส่งแบบเข้าหลังออกก่อน (ดู route.py)
+    # progress(placements): เรียกหลังวางกล่อง/ก้อนแต่ละครั้ง ถ้าคืน False หยุดและคืนแผนเท่าที่วางได้ (ดู jobs.py)
+    if strategy not in STRATEGIES:
+        raise ValueError(f"unknown packing strategy: {strategy!r}")
+    with profiler.phase('sort'):
+        boxes = sort_boxes(boxes, order, by_stop=multi_drop)
+    with profiler.phase('pack'):
+        if strategy == 'cursor':
+            return pack_boxes_cursor(space_dim, max_weight, boxes, order=None, profiler=profiler, axles=axles,
+                                     progress=progress)
+        packer = SpacePacker(space_dim, max_weight, resolution=resolution, axles=axles, multi_drop=multi_drop,
+                             progress=progress)
+        packer.pack(boxes, bulk=bulk, order=None)
+        profiler.count('placements_attempted', packer.attempted)
+        profiler.count('placements_accepted', packer.accepted)
+        return packer.result()
+
+
+def pack_boxes_cursor(space_dim, max_weight, boxes, order='volume', profiler=NULL_PROFILER, axles=None,
+                      progress=None):
+    # วิธีเดิม: เลื่อนตำแหน่งไปทีละแถว/ชั้นจากมุม (0, 0, 0)
+    space_w, space_l, space_h = space_dim
+    total_weight = 0
+    packed_boxes = Placements()
+    balance = LoadBalance(axles)
+    pos_x, pos_y, pos_z = 0, 0, 0
+    current_layer_height = 0
+    row_depth = 0
+    attempted = 0
+    stopped = False
+
+    for box in sort_boxes(boxes, order):
+        type_index = packed_boxes.add_type(box['id'])
+        box_orientations = orientations(box)
+        for _ in range(box['quantity']):
+            attempted += 1
+            # ใช้ทิศแรกที่ใส่ได้ที่ตำแหน่งปัจจุบัน
+            dim = next((d for d in box_orientations
+                        if pos_x + d[0] <= space_w and pos_y + d[1] <= space_l and pos_z + d[2] <= space_h), None)
+            if dim is not None:
+                w, l, h = dim
+
+                if total_weight + box['weight'] > max_weight:
+                    break
+                center = (pos_x + w / 2, pos_y + l / 2, pos_z + h / 2)
+                if not balance.allows(box['weight'], center):
+                    break
+
+                packed_boxes.append(type_index, (pos_x, pos_y, pos_z), dim, box['weight'])
+                total_weight += box['weight']
+                balance.add(box['weight'], center)
+
+                pos_x += w
+                # แถวและชั้นต้องลึก/สูงเท่ากล่องที่ใหญ่ที่สุดในนั้น รวมกล่องที่ทำให้ขึ้นแถวใหม่ด้วย
+                row_depth = max(row_depth, l)
+                current_layer_height = max(current_layer_height, h)
+
+                if pos_x >= space_w:
+                    pos_x = 0
+                    pos_y += row_depth
+                    row_depth = 0
+                    if pos_y >= space_l:
+                        pos_y = 0
+                        pos_z += current_layer_height
+                        current_layer_height = 0
+                if progress is not None and not progress(packed_boxes):
+                    stopped = True
+                    break
+            else:
+                break
+        if stopped:
+            break
+
+    profiler.count('placements_attempted', attempted)
+    profiler.count('placements_accepted', len(packed_boxes))
+    space_volume = calculate_volume(space_w, space_l, space_h)
+    used_percent = (packed_boxes.used_volume() / space_volume) * 100
+
+    return packed_boxes, used_percent, total_weight
+
+
+# -----------------------------
+# วิธี maximal space
+# -----------------------------
+# เก็บพื้นที่ว่างสูงสุด (x1, y1, z1, x2, y2, z2) ที่อาจซ้อนทับกันได้
+# วางกล่องที่มุมล่างสุด-ในสุด-ซ้ายสุดของพื้นที่ว่างที่ใส่ได้
+# แล้วตัดพื้นที่ว่างที่ทับกับกล่องออกเป็นชิ้นย่อย และทิ้งชิ้นที่ถูกชิ้นอื่นครอบไว้
+# พื้นที่ว่างเก็บเป็นแถวของ numpy array ที่เรียงตามลำดับการเลือกอยู่เสมอ การตัด/ตรวจการครอบทำทีละทั้ง array
+# ผลตรวจการรองรับที่มุมของแต่ละพื้นที่เก็บไว้ใช้ซ้ำ จนกว่าจะมีกล่องวางทับฐานของพื้นที่นั้น
+
+def split_space(s, b):
+    pieces = []
+    if b[0] > s[0]:
+        pieces.append((s[0], s[1], s[2], b[0], s[4], s[5]))
+    if b[3] < s[3]:
+        pieces.append((b[3], s[1], s[2], s[3], s[4], s[5]))
+    if b[1] > s[1]:
+        pieces.append((s[0], s[1], s[2], s[3], b[1], s[5]))
+    if b[4] < s[4]:
+        pieces.append((s[0], b[4], s[2], s[3], s[4], s[5]))
+    if b[2] > s[2]:
+        pieces.append((s[0], s[1], s[2], s[3], s[4], b[2]))
+    if b[5] < s[5]:
+        pieces.append((s[0], s[1], b[5], s[3], s[4], s[5]))
+    return pieces
+
+def enclosing(a, b):
+    # [m, n]: พื้นที่ a[m] ครอบ b[n] ทั้งหมด
+    result = np.ones((len(a), len(b)), dtype=bool)
+    for axis in range(3):
+        result &= a[:, None, axis] <= b[None, :, axis]
+        result &= a[:, None, axis + 3] >= b[None, :, axis + 3]
+    return result
+
+def block_counts(s, dim, count, wall=False):
+    # จำนวนกล่องตามแกน x, y, z ที่ใส่ในพื้นที่ s ได้ โดยไม่เกิน count ใบ
+    # ปกติเต็มพื้นก่อน (x, y แล้วค่อย z) ถ้า wall ให้ก่อเป็นผนัง (x, z แล้วค่อย y)
+    w, l, h = dim
+    nx = min(int((s[3] - s[0]) // w), count)
+    if wall:
+        nz = min(int((s[5] - s[2]) // h), count // nx)
+        ny = min(int((s[4] - s[1]) // l), count // (nx * nz))
+        return nx, ny, nz
+    ny = min(int((s[4] - s[1]) // l), count // nx)
+    nz = min(int((s[5] - s[2]) // h), count // (nx * ny))
+    return nx, ny, nz
+
+
+def smallest_side(boxes):
+    return min((min(b['width'], b['length'], b['height']) for b in boxes), default=0)
+
+def grid_resolution(boxes):
+    # ช่องที่หยาบที่สุดที่ยังตรงกับขอบกล่องทุกใบ: มุมของพื้นที่ว่างเป็นผลบวกของด้านที่วางในแนวนอน
+    # จึงเป็นพหุคูณของ ห.ร.ม. ของด้านเหล่านั้นเสมอ ผลการตรวจการรองรับเท่ากับช่อง 1 ซม. แต่ช่องน้อยกว่ามาก
+    # ถ้ามีด้านที่ไม่เป็นจำนวนเต็มใช้ช่อง 1 ซม. ตามเดิม
+    sides = {side for box in boxes for dim in orientations(box) for side in dim[:2]}
+    if not all(float(side).is_integer() for side in sides):
+        return 1
+    return math.gcd(*(int(side) for side in sides)) or 1
+
+class SpacePacker:
+    def __init__(self, space_dim, max_weight, min_support=MIN_SUPPORT, resolution=GRID_RESOLUTION, axles=None,
+                 multi_drop=False, progress=None):
+        self.space_dim = space_dim
+        # ส่งหลายจุด: เลือกพื้นที่ว่างที่ลึกที่สุด (y น้อย) ก่อน และก่อกล่องเป็นผนังจากหัวเก๋งไปประตูท้าย
+        self.multi_drop = multi_drop
+        self.max_weight = max_weight
+        self.min_support = min_support
+        space_w, space_l, space_h = space_dim
+        self.spaces = np.array([(0, 0, 0, space_w, space_l, space_h)], dtype='f8')
+        # ความสูงผิวบนของพื้นรถ ใช้ตรวจว่ามีของรองรับด้านล่าง (ขนาดช่องอัตโนมัติเลือกใน use_grid)
+        self.resolution = resolution
+        self.heights = HeightMap(space_w, space_l, resolution or 1)
+        # ฐานและความสูงผิวบนของทุกก้อนที่วาง ตามลำดับ ใช้สร้างแผนที่ความสูงใหม่ตอนย้อนสถานะ
+        self.footprints = []
+        self.min_side = 0
+        # ฐานที่ยาวที่สุดของกล่องที่เคยจัด ตารางใน corner_table ครอบเท่านี้จากมุม
+        self.reach = 0
+        self.packed_boxes = Placements()
+        self.total_weight = 0
+        # โมเมนต์ของน้ำหนักสำหรับตรวจน้ำหนักลงเพลา
+        self.balance = LoadBalance(axles)
+        # จำนวนครั้งที่ค้นหาที่วาง และครั้งที่วางได้ (กล่องเดี่ยวหรือทั้งก้อนนับเป็นหนึ่ง)
+        self.attempted = 0
+        self.accepted = 0
+        # ถูกสั่งหยุดผ่าน progress แล้ว ผลเป็นแผนบางส่วน
+        self.progress = progress
+        self.stopped = False
+        self.reset_checks()
+
+    def reset_checks(self):
+        # ผลตรวจการรองรับที่มุมของพื้นที่ว่างแถวที่ i (ย้าย/ตัดทิ้งไปพร้อมกับแถวของ spaces)
+        # fits[i, k]: กล่องทิศที่ k ของประเภทที่กำลังจัด (fits_for) มีของรองรับพอ ใช้ได้เมื่อ checked[i]
+        # levels[i], tables[i]: ดู measure_level และ corner_table ใช้ได้กับกล่องทุกประเภท (nan / None คือยังไม่ได้คำนวณ)
+        # dead[i]: ไม่มีกล่องใดมีของรองรับที่พื้นของพื้นที่ i ได้อีก จะถูกทิ้งเมื่อวางก้อนถัดไป
+        self.fits_for = None
+        self.fits = np.zeros((len(self.spaces), len(ROTATIONS['all'])), dtype=bool)
+        self.checked = np.zeros(len(self.spaces), dtype=bool)
+        self.tables = np.full(len(self.spaces), None, dtype=object)
+        self.levels = np.full((len(self.spaces), 3), np.nan)
+        self.dead = np.zeros(len(self.spaces), dtype=bool)
+
+    def fitting_spaces(self, box_orientations):
+        # พื้นที่ว่างตามลำดับ (z, y, x) หรือ (y, z, x) เมื่อส่งหลายจุด พร้อมทิศของกล่องที่วางที่มุมนั้นได้
+        if box_orientations != self.fits_for:
+            self.fits_for = box_orientations
+            self.checked[:] = False
+            reach = max(max(w, l) for w, l, h in box_orientations)
+            if reach > self.reach:
+                self.reach = reach
+                self.tables[:] = None
+                self.levels[:] = np.nan
+        k = len(box_orientations)
+        dims = np.array(box_orientations, dtype='f8')
+        fit = (self.spaces[:, None, 3:] - self.spaces[:, None, :3] >= dims[None, :, :]).all(axis=2)
+        # ข้ามพื้นที่ที่ตรวจแล้วว่าไม่มีทิศใดมีของรองรับ โดยไม่ต้องถามแผนที่ความสูงซ้ำ
+        candidates = fit.any(axis=1) & ~(self.checked & ~(fit & self.fits[:, :k]).any(axis=1)) & ~self.dead
+        # จำนวนช่องใต้ฐานของแต่ละทิศที่มุมของทุกพื้นที่ (ทิศที่ใส่ไม่ได้เป็น 0 จึงไม่เกินขอบตาราง)
+        x0, x1 = self.heights.cell_range(self.spaces[:, 0, None], self.spaces[:, 0, None] + dims[None, :, 0])
+        y0, y1 = self.heights.cell_range(self.spaces[:, 1, None], self.spaces[:, 1, None] + dims[None, :, 1])
+        nx, ny = np.where(fit, x1 - x0, 0), np.where(fit, y1 - y0, 0)
+        # ตรวจการรองรับทีละช่วงตามลำดับ ช่วงยาวขึ้นเรื่อยๆ เพื่อไม่ต้องสร้างตารางของพื้นที่ที่ไม่ได้ใช้
+        rows = np.flatnonzero(candidates)
+        start, step = 0, 16
+        while start < len(rows):
+            chunk = rows[start:start + step]
+            start, step = start + step, step * 2
+            self.check_support(chunk[~self.checked[chunk]], nx, ny)
+            usable = fit[chunk] & self.fits[chunk, :k]
+            for i, ok in zip(chunk.tolist(), usable.tolist()):
+                if any(ok):
+                    yield tuple(self.spaces[i].tolist()), [dim for dim, fits in zip(box_orientations, ok) if fits]
+
+    def check_support(self, rows, nx, ny):
+        # fits[rows]: กล่องที่ฐานครอบ nx x ny ช่องจากมุมของพื้นที่มีของรองรับพอ (ทิศที่ใส่ไม่ได้เป็นจริงเสมอ)
+        k = nx.shape[1]
+        self.checked[rows] = True
+        self.fits[rows, :k] = True
+        rows = rows[self.spaces[rows, 2] > EPSILON]
+        for i in rows[np.isnan(self.levels[rows, 0])].tolist():
+            self.measure_level(i)
+        self.fits[rows[self.dead[rows]]] = False
+        rows = rows[~self.dead[rows]]
+        # ตัดทิศที่ช่องที่รองรับได้ทั้งหมด หรือที่อยู่ในระยะของฐาน มีไม่ถึงเกณฑ์แน่ๆ ก่อนสร้าง/เปิดตาราง
+        # เทียบเป็นสัดส่วนเหมือน validate เพราะ min_support * จำนวนช่อง อาจปัดเศษเกินจำนวนเต็ม (0.8 * 15 > 12)
+        area = np.maximum(nx[rows] * ny[rows], 1)
+        total, reach_x, reach_y = self.levels[rows, :, None].transpose(1, 0, 2)
+        bound = np.minimum(total, np.minimum(nx[rows], reach_x) * np.minimum(ny[rows], reach_y))
+        possible = bound / area >= self.min_support
+        self.fits[rows, :k] = possible
+        keep = possible.any(axis=1)
+        rows, area = rows[keep], area[keep]
+        if not len(rows):
+            return
+        for i in rows.tolist():
+            if self.tables[i] is None:
+                self.tables[i] = self.corner_table(i)
+        counts = np.array([table[a, b] for table, a, b in zip(self.tables[rows], nx[rows], ny[rows])])
+        self.fits[rows, :k] &= counts / area >= self.min_support
+
+    def corner(self, i):
+        # ช่องจากมุมของพื้นที่ i ครอบเท่าฐานที่ยาวที่สุด (reach) และช่องที่สูงเท่าพื้นพอดี
+        x, y, z, x2, y2, _ = self.spaces[i].tolist()
+        cells = self.heights.region(x, y, min(x2 - x, self.reach), min(y2 - y, self.reach))
+        return np.abs(cells - z) <= EPSILON
+
+    def measure_level(self, i):
+        # levels[i]: จำนวนช่องที่สูงเท่าพื้นจากมุมของพื้นที่ i และระยะไกลสุดจากมุมตาม x, y (นับเป็นช่อง)
+        level = self.corner(i)
+        xs, ys = np.flatnonzero(level.any(axis=1)), np.flatnonzero(level.any(axis=0))
+        if not len(xs) and self.never_supported(i):
+            self.dead[i] = True
+        self.levels[i] = (np.count_nonzero(level), xs[-1] + 1, ys[-1] + 1) if len(xs) else 0
+
+    def corner_table(self, i):
+        # จำนวนช่องที่สูงเท่าพื้นสะสมจากมุม: [a, b] คือจำนวนใต้ฐานที่ครอบ a x b ช่องแรก
+        # ครอบเท่าฐานที่ยาวที่สุด จึงตอบได้ทุกประเภทกล่องโดยไม่ต้องถามแผนที่ความสูงซ้ำ
+        level = self.corner(i)
+        table = np.zeros((level.shape[0] + 1, level.shape[1] + 1), dtype=np.int32)
+        table[1:, 1:] = level.cumsum(axis=0).cumsum(axis=1)
+        return table
+
+    def never_supported(self, i):
+        # ทุกช่องใต้พื้นที่ i สูงกว่าพื้น หรือต่ำกว่าไม่ถึงความสูงของกล่องที่เตี้ยที่สุด (จึงเติมขึ้นมาถึงพื้นไม่ได้)
+        # ความสูงของช่องไม่เคยลดลง จึงไม่มีทางรองรับกล่องใดที่พื้นนี้ได้อีก
+        x, y, z, x2, y2, _ = self.spaces[i].tolist()
+        cells = self.heights.region(x, y, x2 - x, y2 - y)
+        return not ((np.abs(cells - z) <= EPSILON) | (cells <= z - self.min_side + EPSILON)).any()
+
+    def balanced(self, weight, x, y, z, w, l, h):
+        return self.balance.allows(weight, (x + w / 2, y + l / 2, z + h / 2))
+
+    def occupy(self, block):
+        spaces = self.spaces
+        hit = ((spaces[:, 0] < block[3]) & (block[0] < spaces[:, 3]) &
+               (spaces[:, 1] < block[4]) & (block[1] < spaces[:, 4]) &
+               (spaces[:, 2] < block[5]) & (block[2] < spaces[:, 5]))
+        pieces, parents = [], []
+        for i in np.flatnonzero(hit & ~self.dead).tolist():
+            for p in split_space(spaces[i].tolist(), block):
+                if min(p[3] - p[0], p[4] - p[1], p[5] - p[2]) >= self.min_side:
+                    pieces.append(p)
+                    parents.append(i)
+        keep = np.flatnonzero(~hit & ~self.dead)
+        new = np.array(pieces, dtype='f8').reshape(-1, 6)
+        parents = np.array(parents, dtype=int)
+        if len(new):
+            # ชิ้นใหม่มาจากพื้นที่เดิมที่ถูกตัด จึงตรวจการครอบเฉพาะชิ้นใหม่ก็พอ
+            covered = enclosing(spaces[keep], new).any(axis=0)
+            # inside[m, n]: ชิ้น m ครอบชิ้น n ถ้าซ้ำกันพอดีเก็บไว้ชิ้นแรก
+            inside = enclosing(new, new)
+            index = np.arange(len(new))
+            same = inside & inside.T
+            inside &= (~same | (index[:, None] < index[None, :])) & (index[:, None] != index[None, :])
+            chosen = ~covered & ~inside.any(axis=0)
+            new, parents = new[chosen], parents[chosen]
+
+        # ผลตรวจการรองรับเปลี่ยนเฉพาะพื้นที่ที่มีช่องร่วมกับฐานของก้อน และช่องเหล่านั้นเปลี่ยนมาสูงเท่าพื้นพอดี
+        # หรือเดิมสูงเท่าพื้น/ต่ำพอให้กล่องเติมขึ้นมาถึงพื้นได้ (ดู never_supported)
+        bx0, bx1 = self.heights.cell_range(block[0], block[3])
+        by0, by1 = self.heights.cell_range(block[1], block[4])
+        before = np.unique(self.heights.region(block[0], block[1], block[3] - block[0], block[4] - block[1]))
+
+        def changed(rows):
+            x0, x1 = self.heights.cell_range(rows[:, 0], rows[:, 3])
+            y0, y1 = self.heights.cell_range(rows[:, 1], rows[:, 4])
+            floors = rows[:, 2]
+            return ((x0 < bx1) & (bx0 < x1) & (y0 < by1) & (by0 < y1) &
+                    ((np.abs(floors - block[5]) <= EPSILON) | (before[0] <= floors - self.min_side + EPSILON) |
+                     (np.abs(floors[:, None] - before[None, :]) <= EPSILON).any(axis=1)))
+
+        # ชิ้นที่มุมเดียวกับพื้นที่เดิม ใช้ผลตรวจการรองรับของพื้นที่เดิมต่อได้ (ทิศที่ใส่ได้ตรวจใหม่ทุกครั้งอยู่แล้ว)
+        inherit = (new[:, :3] == spaces[parents, :3]).all(axis=1) & ~changed(new)
+        checked = np.concatenate([self.checked[keep], self.checked[parents] & inherit])
+        fits = np.concatenate([self.fits[keep], self.fits[parents] & inherit[:, None]])
+        tables = np.concatenate([self.tables[keep], np.where(inherit, self.tables[parents], None)])
+        levels = np.concatenate([self.levels[keep], np.where(inherit[:, None], self.levels[parents], np.nan)])
+        stale = np.concatenate([changed(spaces[keep]), np.zeros(len(new), dtype=bool)])
+        checked[stale] = False
+        tables[stale] = None
+        levels[stale] = np.nan
+
+        # ชิ้นใหม่ต่อท้ายแล้วเรียงแบบคงลำดับ พื้นที่ที่ลำดับเท่ากันจึงเรียงตามเวลาที่สร้าง
+        spaces = np.concatenate([spaces[keep], new])
+        if self.multi_drop:
+            order = np.lexsort((spaces[:, 0], spaces[:, 2], spaces[:, 1]))
+        else:
+            order = np.lexsort((spaces[:, 0], spaces[:, 1], spaces[:, 2]))
+        self.spaces = spaces[order]
+        self.checked, self.fits, self.tables, self.levels = checked[order], fits[order], tables[order], levels[order]
+        self.dead = np.zeros(len(order), dtype=bool)
+
+        footprint = (block[0], block[1], block[3] - block[0], block[4] - block[1], block[5])
+        self.footprints.append(footprint)
+        self.heights.place(*footprint)
+
+    def place_box(self, box, type_index, box_orientations):
+        if self.total_weight + box['weight'] > self.max_weight:
+            return False
+        self.attempted += 1
+        # ถ้าวางที่นี่แล้วน้ำหนักลงเพลาเกิน ลองพื้นที่ว่างถัดไป
+        for s, fitting in self.fitting_spaces(box_orientations):
+            w, l, h = fitting[0]
+            x, y, z = s[:3]
+            if self.balanced(box['weight'], x, y, z, w, l, h):
+                break
+        else:
+            # ไม่มีมุมใดใช้ได้ ลองตำแหน่งอื่นภายในพื้นที่ว่าง
+            spot = self.resting_spot(box, box_orientations)
+            if spot is None:
+                return False
+            x, y, z, (w, l, h) = spot
+
+        self.occupy((x, y, z, x + w, y + l, z + h))
+        self.packed_boxes.append(type_index, (x, y, z), (w, l, h), box['weight'])
+        self.total_weight += box['weight']
+        self.balance.add(box['weight'], (x + w / 2, y + l / 2, z + h / 2))
+        self.accepted += 1
+        return True
+
+    def resting_spot(self, box, box_orientations):
+        # ตำแหน่งแรกตามลำดับพื้นที่ว่างที่ใช้ได้ คืน (x, y, z, (w, l, h)) หรือ None
+        dims = np.array(box_orientations, dtype='f8')
+        fit = (self.spaces[:, None, 3:] - self.spaces[:, None, :3] >= dims[None, :, :]).all(axis=2)
+        for i in np.flatnonzero(fit.any(axis=1) & ~self.dead).tolist():
+            spot = self.settle(self.spaces[i].tolist(), [dim for dim, ok in zip(box_orientations, fit[i]) if ok],
+                               box['weight'])
+            if spot is not None:
+                return spot
+        return None
+
+    def settle(self, s, fitting, weight):
+        # ทุกตำแหน่งบนเส้นของช่องในพื้นที่ s: กล่องวางลงถึงผิวสูงสุดใต้ฐาน (footprint_max) ซึ่งไม่ต่ำกว่าพื้นของ s
+        # เหนือผิวสูงสุดไม่มีกล่องอื่นอยู่ จึงไม่ต้องตรวจการชนซ้ำ เลือกที่ต่ำสุด ลึกสุด แล้วชิดซ้ายสุด
+        # (ส่งหลายจุด: ลึกสุดก่อน) ในบรรดาที่มีของรองรับพอและน้ำหนักลงเพลาไม่เกิน
+        x, y, z, x2, y2, z2 = s
+        r = self.heights.resolution
+        gx, gy = math.ceil(x / r - EPSILON) * r, math.ceil(y / r - EPSILON) * r
+        best = None
+        for w, l, h in fitting:
+            if gx + w > x2 + EPSILON or gy + l > y2 + EPSILON:
+                continue
+            rest = self.heights.footprint_max(gx, gy, x2 - gx, y2 - gy, w, l).astype('f8')
+            xs = gx + np.arange(rest.shape[0]) * r
+            ys = gy + np.arange(rest.shape[1]) * r
+            ok = ((xs[:, None] + w <= x2 + EPSILON) & (ys[None, :] + l <= y2 + EPSILON) &
+                  (rest <= z + EPSILON) & (rest + h <= z2 + EPSILON))
+            if not ok.any():
+                continue
+            support = self.heights.footprint_support(gx, gy, x2 - gx, y2 - gy, w, l, np.where(ok, rest, np.nan))
+            ok &= (rest <= EPSILON) | (support >= self.min_support)
+            a, b = np.nonzero(ok)
+            zs = rest[a, b]
+            keys = (a, zs, b) if self.multi_drop else (a, b, zs)
+            for k in np.lexsort(keys).tolist():
+                spot = (float(xs[a[k]]), float(ys[b[k]]), float(zs[k]), (w, l, h))
+                if self.balanced(weight, *spot[:3], w, l, h):
+                    key = (spot[1], spot[2], spot[0]) if self.multi_drop else (spot[2], spot[1], spot[0])
+                    if best is None or key < best[0]:
+                        best = (key, spot)
+                    break
+        return None if best is None else best[1]
+
+    def supported_block(self, s, dim, count):
+        # ก้อนที่มุมของพื้นที่ s ซึ่งกล่องทุกใบในแถวล่างมีของรองรับพอ คืน ((nx, ny, nz), จำนวนกล่องแถวแรกตามแกน x)
+        # การรองรับของทุกใบคำนวณครั้งเดียว แล้วหาก้อนย่อยที่ใหญ่ที่สุดจากมุมเดียวกัน แทนการลองวางซ้ำทีละขนาด
+        nx, ny, nz = block_counts(s, dim, count, wall=self.multi_drop)
+        ok = self.heights.block_support(s[0], s[1], dim[0], dim[1], s[2], nx, ny) >= self.min_support
+        # จำนวนกล่องที่รองรับติดกันจากมุมในแต่ละแถว x แล้วความกว้าง y ที่ใช้ได้เมื่อเอา a แถวแรก
+        runs = np.logical_and.accumulate(ok, axis=1).sum(axis=1)
+        row = max(int(np.logical_and.accumulate(ok[:, 0]).sum()), 1)
+        if runs.min() == ny:
+            return (nx, ny, nz), row
+        height = int((s[5] - s[2]) // dim[2])
+        best = (1, 1, 1)
+        for a, b in enumerate(np.minimum.accumulate(runs).tolist(), start=1):
+            if b == 0:
+                break
+            c = min(height, count // (a * b))
+            if a * b * c > best[0] * best[1] * best[2]:
+                best = (a, b, c)
+        return best, row
+
+    def place_block(self, box, type_index, count, box_orientations):
+        # วางกล่องชนิดเดียวกันเป็นก้อน nx * ny * nz ในพื้นที่ว่างเดียวในครั้งเดียว
+        if box['weight'] > 0:
+            count = min(count, int((self.max_weight - self.total_weight) // box['weight']))
+        if count <= 0:
+            return 0
+        self.attempted += 1
+        for s, fitting in self.fitting_spaces(box_orientations):
+            x, y, z = s[:3]
+            # เลือกทิศที่ได้ก้อนใหญ่ที่สุดในพื้นที่นี้ หลังลดก้อนให้เหลือเฉพาะส่วนที่กล่องแถวล่างมีของรองรับครบ
+            blocks = [(self.supported_block(s, dim, count), dim) for dim in fitting]
+            (block, row), (w, l, h) = max(blocks, key=lambda b: b[0][0][0] * b[0][0][1] * b[0][0][2])
+            # ถ้าน้ำหนักลงเพลาเกิน ลดเหลือแถวเดียวหรือกล่องเดียว ถ้ากล่องเดียวยังเกินเพลา ลองพื้นที่ว่างถัดไป
+            for nx, ny, nz in (block, (row, 1, 1), (1, 1, 1)):
+                if self.balanced(nx * ny * nz * box['weight'], x, y, z, nx * w, ny * l, nz * h):
+                    break
+            else:
+                continue
+            break
+        else:
+            return 0
+
+        self.occupy((x, y, z, x + nx * w, y + ny * l, z + nz * h))
+        self.packed_boxes.extend_block(type_index, (x, y, z), (w, l, h), (nx, ny, nz), box['weight'])
+        placed = nx * ny * nz
+        self.total_weight += placed * box['weight']
+        self.balance.add(placed * box['weight'], (x + nx * w / 2, y + ny * l / 2, z + nz * h / 2))
+        self.accepted += 1
+        return placed
+
+    def pack(self, boxes, bulk=True, order='volume'):
+        boxes = sort_boxes(boxes, order, by_stop=self.multi_drop)
+        self.min_side = smallest_side(boxes)
+        self.use_grid(boxes)
+        for box in boxes:
+            self.pack_type(box, bulk)
+            if self.stopped:
+                break
+
+    def use_grid(self, boxes):
+        # เลือกขนาดช่องจากกล่องที่จะจัด ทำได้เฉพาะก่อนวางก้อนแรก
+        if self.resolution is None and not self.footprints:
+            self.heights = HeightMap(self.space_dim[0], self.space_dim[1], grid_resolution(boxes))
+
+    def reported(self):
+        if self.progress is not None and not self.progress(self.packed_boxes):
+            self.stopped = True
+        return not self.stopped
+
+    def pack_type(self, box, bulk=True):
+        type_index = self.packed_boxes.add_type(box['id'])
+        box_orientations = orientations(box)
+        if bulk:
+            remaining = box['quantity']
+            while remaining > 0:
+                placed = self.place_block(box, type_index, remaining, box_orientations)
+                if placed == 0 or not self.reported():
+                    break
+                remaining -= placed
+            return
+        for _ in range(box['quantity']):
+            # หน่วยที่เหมือนกันวางไม่ได้แล้ว หน่วยถัดไปก็วางไม่ได้เช่นกัน
+            if not self.place_box(box, type_index, box_orientations) or not self.reported():
+                break
+
+    def snapshot(self):
+        # array ของพื้นที่ว่างถูกสร้างใหม่ทุกครั้งที่วาง ไม่ถูกแก้ไขในที่ จึงเก็บไว้ได้โดยไม่ต้องคัดลอก
+        return (self.spaces, len(self.packed_boxes), len(self.packed_boxes.types),
+                len(self.footprints), self.total_weight, self.balance.state())
+
+    def restore(self, state):
+        spaces, rows, types, footprints, total_weight, balance = state
+        self.spaces = spaces
+        self.reset_checks()
+        self.balance.restore(balance)
+        self.packed_boxes.truncate(rows, types)
+        del self.footprints[footprints:]
+        self.total_weight = total_weight
+        self.heights = HeightMap(self.space_dim[0], self.space_dim[1], self.heights.resolution)
+        for footprint in self.footprints:
+            self.heights.place(*footprint)
+
+    def result(self):
+        space_volume = calculate_volume(*self.space_dim)
+        used_percent = (self.packed_boxes.used_volume() / space_volume) * 100
+        return self.packed_boxes, used_percent, self.total_weight
+
+
+# -----------------------------
+# จัดใหม่เฉพาะส่วนที่แก้ไข
+# -----------------------------
+# เก็บสถานะของ SpacePacker ก่อนจัดกล่องแต่ละประเภท (ตามลำดับหลังเรียง)
+# เมื่อรายการกล่องเปลี่ยน ย้อนไปที่ประเภทแรกที่ต่างจากเดิมแล้วจัดต่อจากตรงนั้น
+# ผลลัพธ์เหมือนกับ pack_boxes(..., strategy='maximal_space') ทุกประการ
+
+class IncrementalPacker:
+    def __init__(self, space_dim, max_weight, bulk=True, order='volume', resolution=GRID_RESOLUTION, axles=None,
+                 multi_drop=False):
+        self.space_dim = tuple(space_dim)
+        self.max_weight = max_weight
+        self.axles = axles
+        self.multi_drop = multi_drop
+        self.bulk = bulk
+        self.order = order
+        self.resolution = resolution
+        self.packer = None
+        self.boxes = []
+        self.checkpoints = []
+        # จำนวนประเภทกล่องที่ใช้ผลเดิมได้ในการจัดครั้งล่าสุด
+        self.reused = 0
+
+    def pack(self, boxes, profiler=NULL_PROFILER, progress=None):
+        with profiler.phase('sort'):
+            boxes = [dict(b) for b in sort_boxes(boxes, self.order, by_stop=self.multi_drop)]
+
+        start = 0
+        # min_side มีผลต่อการตัดพื้นที่ว่าง และขนาดช่องอัตโนมัติมีผลต่อแผนที่ความสูง ถ้าเปลี่ยนต้องเริ่มใหม่ทั้งหมด
+        if (self.packer is not None and self.packer.min_side == smallest_side(boxes)
+                and (self.resolution is not None or self.packer.heights.resolution == grid_resolution(boxes))):
+            for old, new in zip(self.boxes, boxes):
+                if old != new:
+                    break
+                start += 1
+
+        with profiler.phase('pack'):
+            if start == 0:
+                self.packer = SpacePacker(self.space_dim, self.max_weight, resolution=self.resolution,
+                                          axles=self.axles, multi_drop=self.multi_drop)
+                self.packer.min_side = smallest_side(boxes)
+                self.packer.use_grid(boxes)
+                self.checkpoints = [self.packer.snapshot()]
+            elif start < len(self.boxes):
+                self.packer.restore(self.checkpoints[start])
+                del self.checkpoints[start + 1:]
+
+            attempted, accepted = self.packer.attempted, self.packer.accepted
+            self.packer.progress = progress
+            for box in boxes[start:]:
+                self.packer.pack_type(box, self.bulk)
+                if self.packer.stopped:
+                    break
+                self.checkpoints.append(self.packer.snapshot())
+            profiler.count('placements_attempted', self.packer.attempted - attempted)
+            profiler.count('placements_accepted', self.packer.accepted - accepted)
+
+            self.reused = start
+            packed_boxes, used_percent, total_weight = self.packer.result()
+            self.packer.progress = None
+            if self.packer.stopped:
+                # ถูกยกเลิกกลางประเภท สถานะภายในไม่ตรงกับ checkpoint ครั้งหน้าจึงจัดใหม่ทั้งหมด
+                self.packer = None
+            self.boxes = boxes
+            # คืนสำเนา เพราะการจัดครั้งถัดไปจะย้อน/แก้ไขผลภายใน
+            return packed_boxes.copy(), used_percent, total_weight
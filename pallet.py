@@ -0,0 +1,166 @@
+import numpy as np
+
+from packing import calculate_volume, pack_boxes, sort_boxes, stop_of
+from placements import PLACEMENT_DTYPE, Placements
+from plan_cache import manifest_key
+
+# -----------------------------
+# จัดกล่องลงพาเลทก่อน แล้วจัดพาเลทลงรถ
+# -----------------------------
+# ขั้นแรก: กล่องแต่ละรายการจัดเป็นพาเลทเต็มแบบเดียวกันให้มากที่สุด (รูปแบบเดียวใช้ได้ทุกพาเลท)
+# เศษที่เหลือของทุกรายการในจุดส่งเดียวกันรวมเป็นพาเลทผสมทีละพาเลทจนหมด
+# รูปแบบพาเลทเก็บใน PlanCache ด้วยคีย์ของขนาด/น้ำหนัก/การหมุนของกล่อง (ไม่รวมรหัส)
+# จึงใช้ซ้ำข้ามการคำนวณและข้ามใบสั่งที่มีกล่องแบบเดียวกันได้
+# ขั้นที่สอง: พาเลทกลายเป็นกล่องใหญ่ (หมุนได้เฉพาะแนวนอน) จัดลงรถด้วย pack_boxes
+# แล้วแตกกลับเป็นพื้นพาเลทและกล่องจริง เพื่อแสดงผลและตรวจความถูกต้องได้เหมือนแผนปกติ
+# กล่องที่ใหญ่หรือหนักเกินพาเลทจะจัดลงรถแบบกล่องเดี่ยว
+
+# ขนาดพาเลท (cm), น้ำหนักพาเลทเปล่า และขีดจำกัดของสินค้าบนพาเลท (max_height รวมความสูงพาเลท)
+PALLETS = {
+    'euro': {'width': 80, 'length': 120, 'height': 15, 'weight': 25, 'max_load': 1000, 'max_height': 180},
+    'standard': {'width': 100, 'length': 120, 'height': 15, 'weight': 30, 'max_load': 1200, 'max_height': 180},
+}
+
+
+def load_space(pallet):
+    return pallet['width'], pallet['length'], pallet['max_height'] - pallet['height']
+
+def pallet_pattern(pallet, boxes, strategy='maximal_space', cache=None):
+    # Placements ของกล่องบนพาเลทหนึ่งใบ (z เริ่มที่ผิวพาเลท) ประเภทที่ n คือ boxes[n]
+    indexed = [{key: value for key, value in dict(box, id=n).items() if key != 'stop'}
+               for n, box in enumerate(boxes)]
+    space = load_space(pallet)
+    key = manifest_key(space, pallet['max_load'], indexed, strategy=strategy, stage='pallet')
+    pattern = cache.get(key) if cache is not None else None
+    if pattern is None:
+        pattern = pack_boxes(space, pallet['max_load'], indexed, strategy=strategy)[0]
+        if cache is not None:
+            cache.put(key, pattern)
+    return pattern
+
+def pattern_counts(pattern, size):
+    return np.bincount(np.array(pattern.types, dtype=int)[pattern.data['type']], minlength=size)
+
+def per_pallet_bound(pallet, box):
+    # จำนวนสูงสุดที่อาจวางได้บนพาเลทเดียว ตามปริมาตรและน้ำหนัก
+    bound = int(calculate_volume(*load_space(pallet)) // calculate_volume(box['width'], box['length'], box['height']))
+    if box['weight'] > 0:
+        bound = min(bound, int(pallet['max_load'] // box['weight']))
+    return bound
+
+def build_pallets(pallet, boxes, strategy='maximal_space', cache=None):
+    # คืน (loads, loose) โดย load คือ dict: pattern, ids (รหัสกล่องของแต่ละประเภท), count, stop
+    loads, loose, remainder = [], [], []
+    for box in boxes:
+        if box['quantity'] <= 0:
+            continue
+        # รูปแบบพาเลทเต็มไม่ขึ้นกับจำนวนที่สั่ง จึงใช้ซ้ำได้ทุกใบสั่ง
+        bound = per_pallet_bound(pallet, box)
+        pattern = pallet_pattern(pallet, [dict(box, quantity=bound)], strategy, cache) if bound else Placements()
+        per = len(pattern)
+        if per == 0:
+            loose.append(dict(box))
+            continue
+        full = box['quantity'] // per
+        if full:
+            loads.append({'pattern': pattern, 'ids': [box['id']], 'count': full, 'stop': stop_of(box)})
+        if box['quantity'] - full * per:
+            remainder.append(dict(box, quantity=box['quantity'] - full * per))
+
+    for stop in sorted({stop_of(box) for box in remainder}):
+        mixed = [box for box in remainder if stop_of(box) == stop]
+        while mixed:
+            pattern = pallet_pattern(pallet, mixed, strategy, cache)
+            if len(pattern) == 0:
+                loose.extend(mixed)
+                break
+            loads.append({'pattern': pattern, 'ids': [box['id'] for box in mixed], 'count': 1, 'stop': stop})
+            for box, count in zip(mixed, pattern_counts(pattern, len(mixed))):
+                box['quantity'] -= int(count)
+            mixed = [box for box in mixed if box['quantity'] > 0]
+    return loads, loose
+
+def load_height(pattern):
+    d = pattern.data
+    return float((d['z'] + d['h']).max()) if len(d) else 0.0
+
+def expand(boxes, placed, pallet, pallet_id, loads, loose):
+    # แตกพาเลทที่จัดลงรถแล้วเป็นพื้นพาเลท + กล่อง ตามรูปแบบของแต่ละพาเลท
+    result = Placements(capacity=max(len(placed), 1))
+    # ประเภทของกล่องแยกตาม (รหัส, จุดส่ง) หนึ่งประเภทต่อรายการตามลำดับเดียวกับ pack_boxes แบบส่งหลายจุด
+    # route.placement_stops จึงหาจุดส่งจากประเภทได้เหมือนแผนปกติ
+    type_of = {}
+    for box in sort_boxes(boxes, order=None, by_stop=True):
+        type_of.setdefault((box['id'], stop_of(box)), result.add_type(box['id']))
+
+    def type_index(box_id, stop=None):
+        if (box_id, stop) not in type_of:
+            type_of[box_id, stop] = result.add_type(box_id)
+        return type_of[box_id, stop]
+
+    rows = placed.data
+    unit_of = np.array(placed.types, dtype=int)[rows['type']] if len(rows) else np.empty(0, dtype=int)
+    for unit in np.unique(unit_of).tolist():
+        at = rows[unit_of == unit]
+        if unit >= len(loads):
+            copy = at.copy()
+            box = loose[unit - len(loads)]
+            copy['type'] = type_index(box['id'], stop_of(box))
+            result.extend(copy)
+            continue
+
+        load = loads[unit]
+        deck = at.copy()
+        deck['h'] = pallet['height']
+        deck['weight'] = pallet['weight']
+        deck['type'] = type_index(pallet_id)
+        result.extend(deck)
+
+        pattern = load['pattern'].data
+        # พาเลทที่ถูกหมุน 90° สลับแกน x/y ของกล่องบนพาเลท
+        turned = at['w'] != pallet['width']
+        types = np.array([type_index(load['ids'][n], load['stop']) for n in load['pattern'].types],
+                         dtype='i4')[pattern['type']]
+        boxes = np.empty((len(at), len(pattern)), dtype=PLACEMENT_DTYPE)
+        px = np.where(turned[:, None], pattern['y'][None, :], pattern['x'][None, :])
+        py = np.where(turned[:, None], pattern['x'][None, :], pattern['y'][None, :])
+        boxes['x'] = at['x'][:, None] + px
+        boxes['y'] = at['y'][:, None] + py
+        boxes['z'] = at['z'][:, None] + pallet['height'] + pattern['z'][None, :]
+        boxes['w'] = np.where(turned[:, None], pattern['l'][None, :], pattern['w'][None, :])
+        boxes['l'] = np.where(turned[:, None], pattern['w'][None, :], pattern['l'][None, :])
+        boxes['h'] = pattern['h'][None, :]
+        boxes['weight'] = pattern['weight'][None, :]
+        boxes['type'] = types[None, :]
+        result.extend(boxes.reshape(-1))
+    return result
+
+def pack_palletized(space_dim, max_weight, boxes, pallet='euro', strategy='maximal_space', cache=None, **options):
+    # คืน (placements, used_percent, total_weight, summary) summary คือจำนวนพาเลทแต่ละรูปแบบที่ต้องใช้/จัดได้
+    spec = PALLETS[pallet]
+    loads, loose = build_pallets(spec, boxes, strategy, cache)
+    units = [
+        {'id': n, 'width': spec['width'], 'length': spec['length'], 'height': spec['height'] + load_height(load['pattern']),
+         'weight': spec['weight'] + load['pattern'].total_weight(), 'quantity': load['count'], 'rotation': 'upright',
+         'stop': load['stop']}
+        for n, load in enumerate(loads)
+    ] + [dict(box, id=len(loads) + n) for n, box in enumerate(loose)]
+    # พาเลทวางบนพื้นรถเท่านั้น ผิวบนของสินค้าบนพาเลท (โดยเฉพาะพาเลทผสม) มักไม่เรียบ ของที่วางทับจึงลอยได้
+    # เรียงตามขนาดจริงก่อน แล้วให้พาเลทสูงถึงเพดานตอนจัดลงรถ จึงไม่มีอะไรวางทับ (ความสูงจริงใช้ตอนแตกพาเลท)
+    ordered = [dict(unit, height=max(unit['height'], space_dim[2])) if unit['id'] < len(loads) else unit
+               for unit in sort_boxes(units, options.pop('order', 'volume'))]
+    placed, _, total_weight = pack_boxes(space_dim, max_weight, ordered, strategy=strategy, order=None, **options)
+
+    placements = expand(boxes, placed, spec, f"pallet-{pallet}", loads, loose)
+    used_percent = placements.used_volume() / calculate_volume(*space_dim) * 100
+    counts = np.bincount(np.array(placed.types, dtype=int)[placed.data['type']], minlength=len(units))
+    summary = []
+    for n, unit in enumerate(units):
+        if n < len(loads):
+            ids, pattern = loads[n]['ids'], loads[n]['pattern']
+            contents = {box_id: int(count) for box_id, count in zip(ids, pattern_counts(pattern, len(ids))) if count}
+        else:
+            contents = {loose[n - len(loads)]['id']: 1}
+        summary.append({'pallet': n < len(loads), 'boxes': contents, 'needed': unit['quantity'],
+                        'loaded': int(counts[n]), 'height': unit['height'], 'weight': unit['weight']})
+    return placements, used_percent, total_weight, summary
@@ -0,0 +1,142 @@
+import numpy as np
+
+# -----------------------------
+# ที่เก็บผลการจัดวางแบบคอลัมน์
+# -----------------------------
+# หนึ่งแถวต่อกล่องหนึ่งใบ (32 ไบต์) แทน dict ต่อกล่อง
+PLACEMENT_DTYPE = np.dtype([
+    ('x', 'f4'), ('y', 'f4'), ('z', 'f4'),
+    ('w', 'f4'), ('l', 'f4'), ('h', 'f4'),
+    ('weight', 'f4'), ('type', 'i4'),
+])
+
+# มุมของกล่อง 8 จุด (ลำดับเดียวกับ render.CUBE_I/J/K)
+CORNERS = np.array([
+    [0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0],
+    [0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1],
+], dtype='f4')
+
+
+class PlacedBox:
+    # มุมมองของกล่องหนึ่งใบ อ่านได้แบบ dict เดิม เช่น box['pos']
+    __slots__ = ('_placements', '_index')
+
+    def __init__(self, placements, index):
+        self._placements = placements
+        self._index = index
+
+    def __getitem__(self, key):
+        row = self._placements.data[self._index]
+        if key == 'id':
+            return self._placements.types[row['type']]
+        if key == 'pos':
+            return (row['x'].item(), row['y'].item(), row['z'].item())
+        if key == 'dim':
+            return (row['w'].item(), row['l'].item(), row['h'].item())
+        if key == 'weight':
+            return row['weight'].item()
+        raise KeyError(key)
+
+    def __repr__(self):
+        return f"PlacedBox(id={self['id']!r}, pos={self['pos']}, dim={self['dim']})"
+
+
+class Placements:
+    def __init__(self, capacity=64):
+        # types[i] คือรหัสกล่อง (id) ของประเภทที่ i
+        self.types = []
+        self._rows = np.zeros(capacity, dtype=PLACEMENT_DTYPE)
+        self._size = 0
+
+    @classmethod
+    def wrap(cls, rows, types):
+        # ใช้ array เดิมโดยไม่คัดลอก (เช่น memmap ของไฟล์แผน) การเพิ่มแถวภายหลังจะคัดลอกออกมาก่อน
+        placements = cls(capacity=0)
+        placements.types = list(types)
+        placements._rows = rows
+        placements._size = len(rows)
+        return placements
+
+    def add_type(self, box_id):
+        self.types.append(box_id)
+        return len(self.types) - 1
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        if needed > len(self._rows):
+            rows = np.zeros(max(needed, 2 * len(self._rows)), dtype=PLACEMENT_DTYPE)
+            rows[:self._size] = self._rows[:self._size]
+            self._rows = rows
+
+    def append(self, type_index, pos, dim, weight):
+        self._reserve(1)
+        self._rows[self._size] = (*pos, *dim, weight, type_index)
+        self._size += 1
+
+    def extend(self, rows):
+        self._reserve(len(rows))
+        self._rows[self._size:self._size + len(rows)] = rows
+        self._size += len(rows)
+
+    def extend_block(self, type_index, origin, dim, counts, weight):
+        # กล่องขนาดเดียวกันเรียงเป็นก้อน nx * ny * nz (แกน x เปลี่ยนเร็วที่สุด)
+        nx, ny, nz = counts
+        iz, iy, ix = np.indices((nz, ny, nx)).reshape(3, -1)
+        rows = np.empty(len(ix), dtype=PLACEMENT_DTYPE)
+        rows['x'] = origin[0] + ix * dim[0]
+        rows['y'] = origin[1] + iy * dim[1]
+        rows['z'] = origin[2] + iz * dim[2]
+        rows['w'], rows['l'], rows['h'] = dim
+        rows['weight'] = weight
+        rows['type'] = type_index
+        self.extend(rows)
+
+    def truncate(self, size, types):
+        # ย้อนกลับให้เหลือ size แถวแรกและ types ประเภทแรก
+        self._size = size
+        del self.types[types:]
+
+    def copy(self):
+        other = Placements(capacity=max(self._size, 1))
+        other.types = list(self.types)
+        other.extend(self.data)
+        return other
+
+    def subset(self, mask):
+        other = Placements(capacity=1)
+        other.types = list(self.types)
+        other.extend(self.data[mask])
+        return other
+
+    @property
+    def data(self):
+        return self._rows[:self._size]
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        if not -self._size <= index < self._size:
+            raise IndexError(index)
+        return PlacedBox(self, index % self._size)
+
+    def __iter__(self):
+        for n in range(self._size):
+            yield PlacedBox(self, n)
+
+    def used_volume(self):
+        d = self.data
+        return float(np.sum(d['w'].astype('f8') * d['l'] * d['h']))
+
+    def total_weight(self):
+        return float(np.sum(self.data['weight'], dtype='f8'))
+
+    def ids(self):
+        return np.array(self.types, dtype=object)[self.data['type']]
+
+    def vertices(self, mask=None):
+        # พิกัดมุมทั้ง 8 ของทุกกล่อง รูปร่าง (n, 8, 3)
+        d = self.data if mask is None else self.data[mask]
+        pos = np.stack([d['x'], d['y'], d['z']], axis=1)
+        dim = np.stack([d['w'], d['l'], d['h']], axis=1)
+        return pos[:, None, :] + CORNERS[None, :, :] * dim[:, None, :]
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+from packing import pack_boxes
+from profiling import NULL_PROFILER
+
+# -----------------------------
+# แคชผลการจัดวาง
+# -----------------------------
+# คีย์คือ hash ของขนาดพื้นที่ น้ำหนักสูงสุด และรายการกล่องที่เรียงแล้ว
+# (keep_order=True ใช้ลำดับเดิม เมื่อผลที่ต้องการขึ้นกับลำดับ เช่นลำดับประเภท/แถวในไฟล์แผน)
+# ตัวเลขถูกแปลงเป็น float ก่อน เพื่อให้ 40 กับ 40.0 ได้คีย์เดียวกัน
+
+def normalize(value):
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, dict):
+        return {str(k): normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    # เช่น numpy.int64 จาก number_input หรือ data_editor
+    if hasattr(value, 'item'):
+        return normalize(value.item())
+    return str(value)
+
+def manifest_key(space_dim, max_weight, boxes, keep_order=False, **options):
+    boxes = [normalize(b) for b in boxes]
+    payload = {
+        'space': normalize(list(space_dim)),
+        'max_weight': normalize(max_weight),
+        'boxes': boxes if keep_order else sorted(boxes, key=lambda b: json.dumps(b, sort_keys=True)),
+        'options': normalize(options),
+    }
+    text = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class PlanCache:
+    def __init__(self, maxsize=128, directory=None):
+        self.maxsize = maxsize
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        value = None
+        if self.directory and os.path.exists(self._path(key)):
+            try:
+                with open(self._path(key), 'rb') as f:
+                    value = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                value = None
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+        if self.directory:
+            # เขียนไฟล์ชั่วคราวก่อนแล้วค่อยแทนที่ กันไฟล์เสียเมื่อมีหลาย session เขียนพร้อมกัน
+            tmp = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def cached_pack_boxes(cache, space_dim, max_weight, boxes, profiler=NULL_PROFILER, progress=None, **options):
+    with profiler.phase('cache_lookup'):
+        key = manifest_key(space_dim, max_weight, boxes, **options)
+        result = cache.get(key)
+    profiler.count('cache_hits' if result is not None else 'cache_misses')
+    if result is None:
+        result = pack_boxes(space_dim, max_weight, boxes, profiler=profiler, progress=progress, **options)
+        # แผนที่ถูกยกเลิกกลางทางเป็นแผนบางส่วน ไม่เก็บลงแคช
+        if progress is None or progress(result[0]):
+            cache.put(key, result)
+    return result
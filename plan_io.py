@@ -0,0 +1,218 @@
+import io
+import json
+import os
+import struct
+
+import numpy as np
+
+from placements import CORNERS, PLACEMENT_DTYPE, Placements
+from render import BOX_COLORS
+
+# -----------------------------
+# บันทึก / เปิดแผนการจัดวางแบบไบนารี
+# -----------------------------
+# ไฟล์ .plan: MAGIC (8 ไบต์), version (uint16), สำรอง (uint16), ความยาว header (uint32)
+# ตามด้วย header JSON (ขนาดพื้นที่, น้ำหนัก, รายการกล่อง, รหัสประเภท, จำนวนแถว, ตำแหน่งข้อมูล)
+# แล้วเติมให้ครบ ALIGNMENT ไบต์ ก่อนแถวของ Placements (little-endian, 32 ไบต์ต่อกล่อง)
+# แถวอยู่ต่อกันเป็นก้อนเดียว จึงเปิดแบบ memmap ได้โดยไม่ต้องอ่านทั้งไฟล์
+# เวอร์ชันใหม่ต้องอ่านไฟล์เวอร์ชันเก่าได้ ไฟล์ที่ใหม่กว่าที่รู้จักจะถูกปฏิเสธ
+
+MAGIC = b'TRKPLAN\x00'
+VERSION = 1
+PREFIX = struct.Struct('<8sHHI')
+ALIGNMENT = 64
+ROW_DTYPE = PLACEMENT_DTYPE.newbyteorder('<')
+
+
+def json_value(value):
+    # เช่น numpy.int64 จาก data_editor
+    return value.item() if hasattr(value, 'item') else str(value)
+
+def plan_header(placements, space_dim, max_weight, total_weight=None, boxes=None, **meta):
+    if total_weight is None:
+        total_weight = placements.total_weight()
+    return {
+        **meta,
+        'space': list(space_dim),
+        'max_weight': max_weight,
+        'total_weight': float(total_weight),
+        'boxes': boxes or [],
+        'types': list(placements.types),
+        'count': len(placements),
+        'dtype': [list(field) for field in ROW_DTYPE.descr],
+    }
+
+def save_plan(target, placements, space_dim, max_weight, total_weight=None, boxes=None, **meta):
+    # target เป็น path หรือไฟล์ไบนารีที่เปิดไว้ meta คือข้อมูลเพิ่ม เช่น vehicle, axles, used_percent
+    header = plan_header(placements, space_dim, max_weight, total_weight, boxes, **meta)
+    # ตำแหน่งข้อมูลอยู่ใน header เอง จึงคำนวณซ้ำจนความยาวคงที่
+    offset = 0
+    while True:
+        header['data_offset'] = offset
+        text = json.dumps(header, ensure_ascii=False, default=json_value).encode('utf-8')
+        needed = -(-(PREFIX.size + len(text)) // ALIGNMENT) * ALIGNMENT
+        if needed == offset:
+            break
+        offset = needed
+
+    if isinstance(target, (str, os.PathLike)):
+        with open(target, 'wb') as f:
+            return save_plan(f, placements, space_dim, max_weight, total_weight, boxes, **meta)
+    target.write(PREFIX.pack(MAGIC, VERSION, 0, len(text)))
+    target.write(text)
+    target.write(b'\x00' * (offset - PREFIX.size - len(text)))
+    target.write(placements.data.astype(ROW_DTYPE, copy=False).tobytes())
+    return offset + len(placements) * ROW_DTYPE.itemsize
+
+def plan_bytes(placements, space_dim, max_weight, total_weight=None, boxes=None, **meta):
+    buffer = io.BytesIO()
+    save_plan(buffer, placements, space_dim, max_weight, total_weight, boxes, **meta)
+    return buffer.getvalue()
+
+def read_header(prefix_and_header):
+    magic, version, _, length = PREFIX.unpack_from(prefix_and_header)
+    if magic != MAGIC:
+        raise ValueError("not a packing plan file")
+    if version > VERSION:
+        raise ValueError(f"plan format version {version} is newer than supported version {VERSION}")
+    header = json.loads(bytes(prefix_and_header[PREFIX.size:PREFIX.size + length]).decode('utf-8'))
+    if [tuple(field) for field in header['dtype']] != ROW_DTYPE.descr:
+        raise ValueError(f"unsupported placement layout: {header['dtype']}")
+    return header
+
+def load_plan(source, mmap=False):
+    # source เป็น path หรือ bytes คืน (placements, header)
+    # mmap=True กับ path: แถวเป็น memmap แบบอ่านอย่างเดียว อ่านจากดิสก์เมื่อใช้งานจริง
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            prefix = f.read(PREFIX.size)
+            if len(prefix) < PREFIX.size:
+                raise ValueError("not a packing plan file")
+            header = read_header(prefix + f.read(PREFIX.unpack(prefix)[3]))
+        if mmap and header['count']:
+            rows = np.memmap(source, dtype=ROW_DTYPE, mode='r', offset=header['data_offset'], shape=(header['count'],))
+        else:
+            with open(source, 'rb') as f:
+                f.seek(header['data_offset'])
+                rows = np.frombuffer(f.read(header['count'] * ROW_DTYPE.itemsize), dtype=ROW_DTYPE)
+    else:
+        source = memoryview(source)
+        if len(source) < PREFIX.size:
+            raise ValueError("not a packing plan file")
+        header = read_header(source)
+        if len(source) < header['data_offset'] + header['count'] * ROW_DTYPE.itemsize:
+            raise ValueError("plan file is truncated")
+        rows = np.frombuffer(source, dtype=ROW_DTYPE, count=header['count'], offset=header['data_offset'])
+    if len(rows) != header['count']:
+        raise ValueError("plan file is truncated")
+    # ROW_DTYPE ตรงกับ PLACEMENT_DTYPE บนเครื่อง little-endian จึงไม่ต้องแปลง
+    if rows.dtype != PLACEMENT_DTYPE:
+        rows = rows.astype(PLACEMENT_DTYPE)
+    return Placements.wrap(rows, header['types']), header
+
+
+# -----------------------------
+# ส่งออกเป็นโมเดล 3 มิติ glTF 2.0 (.glb)
+# -----------------------------
+# หนึ่ง primitive ต่อรหัสกล่อง (8 จุด 12 สามเหลี่ยมต่อกล่อง สีเดียวกับ render.box_figure)
+# และเส้นขอบของพื้นที่บรรทุก glTF ใช้หน่วยเมตรและแกน Y ชี้ขึ้น จึงแปลง (x, y, z) cm เป็น (x, z, -y) / 100
+# ไม่ใส่ normal ตัวแสดงผลจะใช้ flat shading ตามมาตรฐาน
+
+# สามเหลี่ยมของกล่องตามมุมใน placements.CORNERS เรียงทวนเข็มเมื่อมองจากด้านนอก
+CUBE_TRIANGLES = np.array([
+    [0, 2, 1], [0, 3, 2], [4, 5, 6], [4, 6, 7],
+    [0, 1, 5], [0, 5, 4], [3, 7, 6], [3, 6, 2],
+    [0, 4, 7], [0, 7, 3], [1, 2, 6], [1, 6, 5],
+], dtype='u4')
+
+SPACE_EDGES = np.array([
+    [0, 1], [1, 2], [2, 3], [3, 0],
+    [4, 5], [5, 6], [6, 7], [7, 4],
+    [0, 4], [1, 5], [2, 6], [3, 7],
+], dtype='u4')
+
+CSS_COLORS = {
+    'lightblue': (173, 216, 230), 'lightsalmon': (255, 160, 122), 'lightgreen': (144, 238, 144),
+    'plum': (221, 160, 221), 'khaki': (240, 230, 140), 'lightpink': (255, 182, 193),
+    'paleturquoise': (175, 238, 238), 'wheat': (245, 222, 179), 'lightsteelblue': (176, 196, 222),
+    'palegreen': (152, 251, 152),
+}
+
+GLB_MAGIC = 0x46546C67
+JSON_CHUNK = 0x4E4F534A
+BIN_CHUNK = 0x004E4942
+
+
+def to_gltf_axes(points):
+    return np.stack([points[..., 0], points[..., 2], -points[..., 1]], axis=-1) / 100
+
+def linear_color(name):
+    # baseColorFactor ของ glTF เป็นค่าเชิงเส้น แปลงจาก sRGB
+    c = np.array(CSS_COLORS[name]) / 255
+    return np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4).tolist()
+
+def glb_bytes(placements, space_dim=None):
+    chunks = []
+    offset = 0
+    gltf = {
+        'asset': {'version': '2.0', 'generator': 'Truck-Sample plan_io'},
+        'scene': 0, 'scenes': [{'nodes': []}], 'nodes': [], 'meshes': [], 'materials': [],
+        'accessors': [], 'bufferViews': [],
+    }
+
+    def add_view(array, target):
+        nonlocal offset
+        data = np.ascontiguousarray(array).tobytes()
+        gltf['bufferViews'].append({'buffer': 0, 'byteOffset': offset, 'byteLength': len(data), 'target': target})
+        chunks.append(data + b'\x00' * (-len(data) % 4))
+        offset += len(data) + (-len(data) % 4)
+        return len(gltf['bufferViews']) - 1
+
+    def add_mesh(name, positions, indices, mode, material=None):
+        positions = positions.astype('f4')
+        gltf['accessors'].append({
+            'bufferView': add_view(positions, 34962), 'componentType': 5126, 'count': len(positions),
+            'type': 'VEC3', 'min': positions.min(axis=0).tolist(), 'max': positions.max(axis=0).tolist(),
+        })
+        gltf['accessors'].append({
+            'bufferView': add_view(indices.astype('u4'), 34963), 'componentType': 5125, 'count': indices.size,
+            'type': 'SCALAR',
+        })
+        primitive = {'attributes': {'POSITION': len(gltf['accessors']) - 2},
+                     'indices': len(gltf['accessors']) - 1, 'mode': mode}
+        if material is not None:
+            primitive['material'] = material
+        gltf['meshes'].append({'name': name, 'primitives': [primitive]})
+        gltf['nodes'].append({'name': name, 'mesh': len(gltf['meshes']) - 1})
+        gltf['scenes'][0]['nodes'].append(len(gltf['nodes']) - 1)
+
+    ids = placements.ids()
+    for n, box_id in enumerate(dict.fromkeys(ids)):
+        mask = ids == box_id
+        gltf['materials'].append({
+            'name': f"Box {box_id}",
+            'pbrMetallicRoughness': {'baseColorFactor': linear_color(BOX_COLORS[n % len(BOX_COLORS)]) + [1.0],
+                                     'metallicFactor': 0.0, 'roughnessFactor': 0.9},
+        })
+        vertices = to_gltf_axes(placements.vertices(mask)).reshape(-1, 3)
+        indices = (np.arange(int(mask.sum()), dtype='u4') * 8)[:, None, None] + CUBE_TRIANGLES[None]
+        add_mesh(f"Box {box_id}", vertices, indices.reshape(-1), 4, len(gltf['materials']) - 1)
+
+    if space_dim is not None:
+        corners = to_gltf_axes(CORNERS * np.asarray(space_dim, dtype='f4'))
+        add_mesh("space", corners, SPACE_EDGES.reshape(-1), 1)
+
+    binary = b''.join(chunks)
+    if binary:
+        gltf['buffers'] = [{'byteLength': len(binary)}]
+    # glTF ไม่อนุญาต array ว่าง (เช่นแผนที่ไม่มีกล่อง)
+    if not gltf['scenes'][0]['nodes']:
+        gltf['scenes'] = [{}]
+    gltf = {key: value for key, value in gltf.items() if value != []}
+    text = json.dumps(gltf, ensure_ascii=False).encode('utf-8')
+    text += b' ' * (-len(text) % 4)
+    total = 12 + 8 + len(text) + (8 + len(binary) if binary else 0)
+    out = [struct.pack('<III', GLB_MAGIC, 2, total), struct.pack('<II', len(text), JSON_CHUNK), text]
+    if binary:
+        out += [struct.pack('<II', len(binary), BIN_CHUNK), binary]
+    return b''.join(out)
@@ -0,0 +1,115 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+
+from packing import ORDERINGS, pack_boxes
+
+# -----------------------------
+# ลองหลายลำดับการจัดพร้อมกันแล้วเก็บแผนที่ดีที่สุด
+# -----------------------------
+# ผลลัพธ์ของการจัดขึ้นกับลำดับกล่องมาก จึงรันทุกลำดับใน ORDERINGS
+# และลำดับสุ่มแบบกำหนด seed ได้ บน process pool ภายในเวลาที่กำหนด
+# pool เดียวขนาดเท่าจำนวน CPU ใช้ร่วมกันทุกครั้งที่เรียก แต่ละครั้งส่งงานพร้อมกันไม่เกิน workers งาน
+# และ worker หยุดเองเมื่อถึงเวลา (ผ่าน progress ของ pack_boxes)
+# จึงไม่มีงานค้างรันต่อหลังคืนผล ลำดับแรกจัดใน process ที่เรียกโดยไม่จำกัดเวลา
+# จึงมีแผนเต็มอย่างน้อยหนึ่งแผนเสมอ
+
+OBJECTIVES = {
+    'utilization': lambda result: (result[1], -result[2]),
+    'weight': lambda result: (result[2], result[1]),
+}
+
+POOL_SIZE = os.cpu_count() or 1
+
+# สร้างครั้งแรกที่ใช้ และสร้างใหม่ถ้า pool เดิมพัง (เช่น worker ถูก kill)
+POOL = None
+POOL_LOCK = threading.Lock()
+
+
+def shared_pool():
+    global POOL
+    with POOL_LOCK:
+        if POOL is None:
+            POOL = ProcessPoolExecutor(max_workers=POOL_SIZE)
+        return POOL
+
+def discard_pool(pool):
+    # pool ที่พังแล้วรับงานไม่ได้อีก ถ้ายังเก็บไว้ทุกครั้งหลังจากนี้จะล้มเหลว
+    global POOL
+    with POOL_LOCK:
+        if POOL is pool:
+            POOL = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def pack_before(deadline, space_dim, max_weight, boxes, **options):
+    # รันใน worker: หยุดเมื่อเลย deadline (time.time() เทียบข้าม process ได้) แล้วคืน None
+    # เพราะแผนบางส่วนเอาไปเทียบกับแผนเต็มไม่ได้
+    finished = True
+
+    def keep_going(placements):
+        nonlocal finished
+        finished = time.time() < deadline
+        return finished
+
+    result = pack_boxes(space_dim, max_weight, boxes, progress=keep_going, **options)
+    return result if finished else None
+
+def portfolio_candidates(boxes, shuffles=8, seed=0):
+    for order in ORDERINGS:
+        yield order, boxes, order
+    rnd = random.Random(seed)
+    for n in range(shuffles):
+        shuffled = list(boxes)
+        rnd.shuffle(shuffled)
+        yield f"shuffle_{n + 1}", shuffled, None
+
+def run_portfolio(space_dim, max_weight, boxes, strategy='maximal_space', objective='utilization',
+                  time_budget=2.0, workers=None, shuffles=8, seed=0, axles=None, multi_drop=False):
+    score = OBJECTIVES[objective]
+    deadline = time.time() + time_budget
+    options = dict(strategy=strategy, axles=axles, multi_drop=multi_drop)
+    (first_label, first, first_order), *others = portfolio_candidates(boxes, shuffles, seed)
+
+    limit = min(workers or POOL_SIZE, POOL_SIZE)
+    pool = shared_pool()
+    waiting = iter(others)
+    futures, running, results = {}, set(), {}
+
+    def submit():
+        for label, candidate, order in islice(waiting, limit - len(running)):
+            future = pool.submit(pack_before, deadline, space_dim, max_weight, candidate, order=order, **options)
+            futures[future] = label
+            running.add(future)
+
+    def collect(done):
+        for future in done:
+            result = future.result()
+            if result is not None:
+                results[futures[future]] = result
+
+    try:
+        submit()
+        results[first_label] = pack_boxes(space_dim, max_weight, first, order=first_order, **options)
+        while running and time.time() < deadline:
+            done, running = wait(running, timeout=deadline - time.time(), return_when=FIRST_COMPLETED)
+            collect(done)
+            if time.time() < deadline:
+                submit()
+        collect({future for future in running if future.done()})
+    except BrokenProcessPool:
+        discard_pool(pool)
+        raise
+    # งานที่ยังไม่เริ่มยกเลิกได้ ที่เริ่มแล้วจะหยุดเองที่ deadline
+    for future in running:
+        future.cancel()
+
+    best_label = max(results, key=lambda label: score(results[label]))
+    summary = [
+        {'order': label, 'used_percent': result[1], 'total_weight': result[2]}
+        for label, result in sorted(results.items(), key=lambda item: score(item[1]), reverse=True)
+    ]
+    return best_label, results[best_label], summary
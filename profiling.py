@@ -0,0 +1,53 @@
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+# -----------------------------
+# จับเวลาและนับจำนวนในแต่ละขั้นตอน (เปิดใช้เมื่อต้องการ)
+# -----------------------------
+# ขั้นตอน: sort, pack, figure, figure_json, plotly_chart
+# compute ในหน้าเว็บคือเวลารวมของการคำนวณแผน (แคช พาเลท ปรับปรุงแผน) ซึ่งรวม sort / pack ไว้แล้ว
+# ชื่อขั้นตอนซ้อนกันต้องไม่ซ้ำ เพราะเวลาชื่อเดียวกันถูกบวกรวมกัน
+# ตัวนับ: placements_attempted, placements_accepted, figure_json_bytes
+# เมื่อปิดอยู่ phase() คืน context ว่างตัวเดียวกันทุกครั้ง และ count() ไม่ทำอะไร
+
+_IDLE = nullcontext()
+
+
+class Profiler:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.timings = {}
+        self.counters = {}
+
+    def phase(self, name):
+        if not self.enabled:
+            return _IDLE
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - started
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def report(self):
+        return {
+            'timings_ms': {name: seconds * 1000 for name, seconds in self.timings.items()},
+            'counters': dict(self.counters),
+        }
+
+    def append_log(self, path, **context):
+        # หนึ่งบรรทัด JSON ต่อการคำนวณหนึ่งครั้ง
+        entry = {'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'), **context, **self.report()}
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+
+NULL_PROFILER = Profiler(enabled=False)
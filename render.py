@@ -0,0 +1,141 @@
+import numpy as np
+import plotly.graph_objects as go
+
+from placements import Placements
+
+# -----------------------------
+# ภาพ 3 มิติของกล่องที่จัดวางแล้ว
+# -----------------------------
+# มุมของกล่อง 8 จุดเรียงตาม placements.CORNERS
+# 0-3 คือพื้นล่าง (z) และ 4-7 คือด้านบน (z+h)
+CUBE_I = np.array([0, 0, 4, 4, 0, 0, 3, 3, 0, 0, 1, 1])
+CUBE_J = np.array([1, 2, 5, 6, 1, 5, 2, 6, 3, 7, 2, 6])
+CUBE_K = np.array([2, 3, 6, 7, 5, 4, 6, 7, 7, 4, 6, 5])
+
+# ขอบ 12 เส้นของกล่อง เป็นคู่ของมุมตาม placements.CORNERS
+CUBE_EDGES = np.array([
+    [0, 1], [1, 2], [2, 3], [3, 0],
+    [4, 5], [5, 6], [6, 7], [7, 4],
+    [0, 4], [1, 5], [2, 6], [3, 7],
+])
+
+# จำนวนกล่องขั้นต่ำที่จะเริ่มรวมกล่องที่ติดกันเป็นก้อนเดียวก่อนวาด
+LOD_THRESHOLD = 2000
+
+BOX_COLORS = [
+    'lightblue', 'lightsalmon', 'lightgreen', 'plum', 'khaki',
+    'lightpink', 'paleturquoise', 'wheat', 'lightsteelblue', 'palegreen',
+]
+
+
+def box_mesh(placements, mask):
+    # รวมทุกกล่องที่เลือกเป็น mesh เดียว (8 จุด 12 สามเหลี่ยมต่อกล่อง)
+    d = placements.data[mask]
+    verts = placements.vertices(mask).reshape(-1, 3)
+    base = (np.arange(len(d)) * 8)[:, None]
+    # ข้อมูล hover ต่อจุด: ลำดับกล่อง, ขนาด, ตำแหน่ง, น้ำหนัก
+    info = np.column_stack([
+        np.arange(1, len(d) + 1), d['w'], d['l'], d['h'], d['x'], d['y'], d['z'], d['weight']
+    ])
+    return dict(
+        x=verts[:, 0], y=verts[:, 1], z=verts[:, 2],
+        i=(base + CUBE_I).ravel(), j=(base + CUBE_J).ravel(), k=(base + CUBE_K).ravel(),
+        customdata=np.repeat(info, 8, axis=0)
+    )
+
+
+def box_edges(placements, mask):
+    # ขอบทุกเส้นเป็น trace เดียว คั่นแต่ละเส้นด้วย NaN เพื่อไม่ให้ลากต่อกัน
+    edges = placements.vertices(mask)[:, CUBE_EDGES]
+    gaps = np.full(edges.shape[:2] + (1, 3), np.nan, dtype=edges.dtype)
+    points = np.concatenate([edges, gaps], axis=2).reshape(-1, 3)
+    return dict(x=points[:, 0], y=points[:, 1], z=points[:, 2])
+
+
+# -----------------------------
+# ลดรายละเอียดสำหรับแผนขนาดใหญ่
+# -----------------------------
+# รวมกล่องประเภทเดียวกันที่วางชิดกันเป็นกล่องสี่เหลี่ยมก้อนเดียว ทีละแกน x, y, z
+# ก้อนที่รวมแล้วมีขนาดเท่าทั้งก้อนและน้ำหนักรวมของกล่องในก้อน
+AXES = (('x', 'w'), ('y', 'l'), ('z', 'h'))
+
+def merge_axis(rows, axis):
+    pos, size = AXES[axis]
+    others = [field for n, pair in enumerate(AXES) if n != axis for field in pair]
+    order = np.lexsort([rows[pos]] + [rows[f] for f in reversed(others)] + [rows['type']])
+    rows = rows[order]
+    same = rows['type'][1:] == rows['type'][:-1]
+    for field in others:
+        same &= rows[field][1:] == rows[field][:-1]
+    # ชิดกันพอดีตามแกนนี้ (เผื่อความคลาดเคลื่อนของ float32)
+    same &= np.abs(rows[pos][1:] - (rows[pos][:-1] + rows[size][:-1])) <= 1e-3
+    starts = np.flatnonzero(np.concatenate([[True], ~same]))
+    merged = rows[starts]
+    ends = np.append(starts[1:], len(rows)) - 1
+    merged[size] = rows[pos][ends] + rows[size][ends] - merged[pos]
+    merged['weight'] = np.add.reduceat(rows['weight'], starts)
+    return merged
+
+def merge_blocks(placements):
+    rows = placements.data.copy()
+    if len(rows) > 1:
+        for axis in range(3):
+            rows = merge_axis(rows, axis)
+    merged = Placements(capacity=max(len(rows), 1))
+    merged.types = list(placements.types)
+    merged.extend(rows)
+    return merged
+
+def layer_mask(placements, z):
+    # กล่องที่ถูกระนาบความสูง z ตัดผ่าน
+    d = placements.data
+    return (d['z'] <= z) & (z < d['z'] + d['h'])
+
+
+def box_figure(placements, title, lod_threshold=None, wireframe=False, z_slice=None):
+    # หนึ่ง trace ต่อรหัสกล่อง แทนหนึ่ง trace ต่อกล่อง
+    # lod_threshold: ถ้ามีกล่องมากกว่านี้ให้รวมกล่องที่ชิดกันก่อนวาด
+    # wireframe: วาดเฉพาะขอบ, z_slice: แสดงเฉพาะชั้นที่ความสูงนั้น
+    if z_slice is not None:
+        placements = placements.subset(layer_mask(placements, z_slice))
+    if lod_threshold is not None and len(placements) > lod_threshold:
+        placements = merge_blocks(placements)
+    ids = placements.ids()
+    fig = go.Figure()
+    for n, box_id in enumerate(dict.fromkeys(ids)):
+        color = BOX_COLORS[n % len(BOX_COLORS)]
+        if wireframe:
+            fig.add_trace(go.Scatter3d(
+                **box_edges(placements, ids == box_id),
+                mode='lines',
+                line=dict(color=color, width=2),
+                hoverinfo='skip',
+                name=f"Box {box_id}",
+                showlegend=True
+            ))
+            continue
+        fig.add_trace(go.Mesh3d(
+            **box_mesh(placements, ids == box_id),
+            color=color,
+            opacity=0.5,
+            flatshading=True,
+            hovertemplate=(
+                f"Box {box_id} #%{{customdata[0]}}<br>"
+                "%{customdata[1]}×%{customdata[2]}×%{customdata[3]} cm "
+                "@ (%{customdata[4]}, %{customdata[5]}, %{customdata[6]})<br>"
+                "%{customdata[7]} kg<extra></extra>"
+            ),
+            name=f"Box {box_id}",
+            showlegend=True
+        ))
+
+    fig.update_layout(
+        scene=dict(
+            xaxis_title='Width (cm)',
+            yaxis_title='Length (cm)',
+            zaxis_title='Height (cm)'
+        ),
+        margin=dict(l=0, r=0, b=0, t=30),
+        title=title
+    )
+    return fig
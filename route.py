@@ -0,0 +1,57 @@
+import numpy as np
+
+from packing import sort_boxes, stop_of
+
+# -----------------------------
+# ประมาณจำนวนกล่องที่ต้องย้ายออกก่อนในแต่ละจุดส่ง
+# -----------------------------
+# ประตูอยู่ท้ายรถ (y มากสุด) ที่จุดส่ง s กล่องของจุดที่ส่งทีหลัง (stop > s) จะขวาง
+# กล่องของจุด s ถ้าอยู่ระหว่างกล่องนั้นกับประตูในแนวเดียวกัน หรือซ้อนอยู่ด้านบน
+# นับกล่องที่ขวางแต่ละใบครั้งเดียวต่อจุดส่ง (ยกออกแล้วใส่กลับ)
+
+# ค่าคลาดเคลื่อนของพิกัด (ซม.)
+EPSILON = 1e-3
+
+# จำนวนคู่กล่องสูงสุดที่เทียบพร้อมกันในหนึ่งรอบ จำกัดหน่วยความจำ
+PAIRS_PER_CHUNK = 2_000_000
+
+
+def placement_stops(placements, boxes):
+    # จุดส่งของกล่องแต่ละใบตามประเภท (type) ไม่ใช่รหัส เพราะรหัสเดียวกันอาจส่งหลายจุด
+    # ตัวจัดแบบส่งหลายจุดสร้างหนึ่งประเภทต่อรายการ ตามลำดับที่จัด (จุดส่งหลังก่อน ดู packing.sort_boxes)
+    # ประเภทที่ k ของรหัสหนึ่งจึงเป็นรายการที่ k ของรหัสนั้นหลังเรียงแบบเดียวกัน
+    stops = {}
+    for box in sort_boxes(boxes, order=None, by_stop=True):
+        stops.setdefault(box['id'], []).append(stop_of(box))
+    seen = {}
+    by_type = []
+    for box_id in placements.types:
+        n = seen[box_id] = seen.get(box_id, -1) + 1
+        queue = stops.get(box_id, [1])
+        by_type.append(queue[min(n, len(queue) - 1)])
+    return np.array(by_type, dtype=int)[placements.data['type']]
+
+def blocked_by(a, b):
+    # [i, j] เป็นจริงถ้ากล่อง b[j] ขวางการยกกล่อง a[i] ออกทางประตูท้าย
+    a, b = a[:, None], b[None, :]
+    across = (a['x'] < b['x'] + b['w'] - EPSILON) & (b['x'] < a['x'] + a['w'] - EPSILON)
+    in_front = ((a['z'] < b['z'] + b['h'] - EPSILON) & (b['z'] < a['z'] + a['h'] - EPSILON) &
+                (b['y'] >= a['y'] + a['l'] - EPSILON))
+    on_top = ((a['y'] < b['y'] + b['l'] - EPSILON) & (b['y'] < a['y'] + a['l'] - EPSILON) &
+              (b['z'] >= a['z'] + a['h'] - EPSILON))
+    return across & (in_front | on_top)
+
+def rehandling_moves(placements, boxes):
+    d = placements.data
+    stops = placement_stops(placements, boxes)
+    report = []
+    for stop in np.unique(stops).tolist():
+        targets = d[stops == stop]
+        later = d[stops > stop]
+        blockers = np.zeros(len(later), dtype=bool)
+        if len(later):
+            chunk = max(1, PAIRS_PER_CHUNK // len(later))
+            for start in range(0, len(targets), chunk):
+                blockers |= blocked_by(targets[start:start + chunk], later).any(axis=0)
+        report.append({'stop': stop, 'boxes': len(targets), 'moves': int(blockers.sum())})
+    return report
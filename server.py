@@ -0,0 +1,278 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import error, request
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from batch import check_manifest, export_manifest, pack_manifest
+from plan_cache import manifest_key
+from plan_io import load_plan
+from validate import is_valid, validate_plan
+
+# -----------------------------
+# บริการจัดกล่องผ่าน HTTP (JSON) สำหรับเครื่องในเครือข่ายภายใน
+# -----------------------------
+# POST /pack    รับ manifest แบบเดียวกับ batch.py คืนผลการจัด
+#               ?format=plan คืนไฟล์แผนไบนารี (plan_io.py), ?format=glb คืนโมเดล 3 มิติ glTF
+# POST /plan    รับไฟล์แผนไบนารี คืน header และผลการตรวจแผน (validate.py)
+# GET  /metrics จำนวนงานและ latency (p50/p90/p99)
+# GET  /health
+# งานที่เหมือนกันและกำลังคำนวณอยู่จะรอผลชุดเดียวกัน (coalescing) เหมือนกันคือกล่องลำดับเดียวกัน
+# เพราะผลขึ้นกับลำดับ และ id เดียวกันสำหรับไฟล์แผน/โมเดลที่บันทึก id ไว้ในไฟล์
+# manifest ที่ผิดรูปแบบตอบ 400 ก่อนเข้าคิว ความผิดพลาดระหว่างคำนวณตอบ 500
+# "optimize" เกิน max_optimize วินาทีตอบ 400 เพราะงานเดียวจะจองช่องในคิวไว้นานเท่านั้น
+# ถ้างานค้างเกิน queue_limit จะตอบ 503 ทันทีแทนการรอ (backpressure)
+
+LATENCY_SAMPLES = 10_000
+
+# เวลาปรับปรุงแผน ("optimize") สูงสุดต่องานที่ยอมรับ (วินาที)
+MAX_OPTIMIZE = 30.0
+
+# รูปแบบผลลัพธ์ของ POST /pack และ Content-Type
+EXPORT_TYPES = {'json': 'application/json', 'plan': 'application/octet-stream', 'glb': 'model/gltf-binary'}
+
+
+class PackingService:
+    def __init__(self, workers=None, queue_limit=64, strategy='maximal_space', max_optimize=MAX_OPTIMIZE):
+        self.strategy = strategy
+        self.max_optimize = max_optimize
+        self.pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+        self.slots = threading.BoundedSemaphore(queue_limit)
+        self.queue_limit = queue_limit
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.counts = {'requests': 0, 'computed': 0, 'coalesced': 0, 'rejected': 0, 'errors': 0}
+
+    def pack(self, manifest, fmt='json'):
+        # คืน (status, payload) payload เป็น bytes เมื่อ fmt เป็น plan / glb
+        started = time.perf_counter()
+        check_manifest(manifest, self.max_optimize)
+        key = manifest_key(manifest['space'], manifest['max_weight'], manifest['boxes'], keep_order=True,
+                           id=manifest.get('id') if fmt != 'json' else None,
+                           strategy=manifest.get('strategy', self.strategy),
+                           order=manifest.get('order', 'volume'), axles=manifest.get('axles'),
+                           multi_drop=manifest.get('multi_drop', False), optimize=manifest.get('optimize', 0),
+                           pallet=manifest.get('pallet'), format=fmt)
+        submitted = False
+        with self.lock:
+            self.counts['requests'] += 1
+            future = self.in_flight.get(key)
+            if future is not None:
+                self.counts['coalesced'] += 1
+            elif not self.slots.acquire(blocking=False):
+                self.counts['rejected'] += 1
+                return 503, {'error': 'queue full, retry later'}
+            else:
+                if fmt == 'json':
+                    future = self.pool.submit(pack_manifest, manifest, self.strategy)
+                else:
+                    future = self.pool.submit(export_manifest, manifest, self.strategy, fmt)
+                self.in_flight[key] = future
+                self.counts['computed'] += 1
+                submitted = True
+        if submitted:
+            # ผูก callback นอก lock เพราะถ้างานเสร็จแล้ว callback จะถูกเรียกทันทีใน thread นี้
+            future.add_done_callback(lambda _: self.release(key))
+
+        try:
+            result = future.result()
+        except Exception as e:
+            with self.lock:
+                self.counts['errors'] += 1
+            return 500, {'error': f"{type(e).__name__}: {e}"}
+        if fmt == 'json':
+            result = dict(result, id=manifest.get('id'))
+        with self.lock:
+            self.latencies.append(time.perf_counter() - started)
+        return 200, result
+
+    def release(self, key):
+        with self.lock:
+            self.in_flight.pop(key, None)
+        self.slots.release()
+
+    def metrics(self):
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000
+            counts = dict(self.counts)
+            in_flight = len(self.in_flight)
+        if len(latencies):
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+            latency = {'p50_ms': p50, 'p90_ms': p90, 'p99_ms': p99, 'max_ms': latencies.max(), 'samples': len(latencies)}
+        else:
+            latency = {'samples': 0}
+        return {**counts, 'in_flight': in_flight, 'queue_limit': self.queue_limit, 'latency': latency}
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def send_json(self, status, payload, headers=()):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_binary(self, payload, content_type):
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path == '/metrics':
+                self.send_json(200, service.metrics())
+            elif self.path == '/health':
+                self.send_json(200, {'status': 'ok'})
+            else:
+                self.send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            url = urlsplit(self.path)
+            if url.path == '/plan':
+                self.inspect_plan()
+                return
+            if url.path != '/pack':
+                self.send_json(404, {'error': 'not found'})
+                return
+            fmt = parse_qs(url.query).get('format', ['json'])[0]
+            if fmt not in EXPORT_TYPES:
+                self.send_json(400, {'error': f"unknown format: {fmt}"})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                manifest = json.loads(self.rfile.read(length))
+                status, payload = service.pack(manifest, fmt)
+            except (ValueError, KeyError, TypeError) as e:
+                status, payload = 400, {'error': f"{type(e).__name__}: {e}"}
+            if status == 200 and fmt != 'json':
+                self.send_binary(payload, EXPORT_TYPES[fmt])
+                return
+            headers = [('Retry-After', '1')] if status == 503 else []
+            self.send_json(status, payload, headers)
+
+        def inspect_plan(self):
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                placements, header = load_plan(self.rfile.read(length))
+                counts, issues = validate_plan(placements, header['space'], header['max_weight'],
+                                               header['total_weight'])
+            except (ValueError, KeyError, TypeError) as e:
+                self.send_json(400, {'error': f"{type(e).__name__}: {e}"})
+                return
+            self.send_json(200, {**header, 'valid': is_valid(counts), 'issues': counts,
+                                 'details': [list(issue) for issue in issues]})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+class PackingHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # backlog ของ socket ต้องรับการเชื่อมต่อพร้อมกันได้มากพอ ให้ 503 เป็นตัวจำกัดแทนการตัดการเชื่อมต่อ
+    request_queue_size = 256
+
+def serve(host='127.0.0.1', port=8765, workers=None, queue_limit=64, max_optimize=MAX_OPTIMIZE):
+    service = PackingService(workers=workers, queue_limit=queue_limit, max_optimize=max_optimize)
+    httpd = PackingHTTPServer((host, port), make_handler(service))
+    print(f"packing service on http://{host}:{port} (POST /pack, GET /metrics)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        service.close()
+
+
+# -----------------------------
+# ตัวทดสอบโหลดภายในเครื่อง
+# -----------------------------
+def sample_manifests(distinct, seed=0):
+    rng = np.random.default_rng(seed)
+    manifests = []
+    for n in range(distinct):
+        boxes = [
+            {'id': f"S{k}", 'width': int(rng.integers(20, 100)), 'length': int(rng.integers(20, 100)),
+             'height': int(rng.integers(20, 80)), 'weight': int(rng.integers(1, 40)),
+             'quantity': int(rng.integers(1, 80)), 'rotation': 'upright'}
+            for k in range(int(rng.integers(1, 10)))
+        ]
+        manifests.append({'id': n, 'space': [244, 1220, 251], 'max_weight': 28000, 'boxes': boxes})
+    return manifests
+
+def post(url, manifest):
+    data = json.dumps(manifest).encode('utf-8')
+    req = request.Request(f"{url}/pack", data=data, headers={'Content-Type': 'application/json'})
+    started = time.perf_counter()
+    try:
+        with request.urlopen(req) as response:
+            response.read()
+            status = response.status
+    except error.HTTPError as e:
+        status = e.code
+    except (error.URLError, ConnectionError):
+        status = 0
+    return status, time.perf_counter() - started
+
+def load_test(url, requests=500, concurrency=32, distinct=20, seed=0):
+    manifests = sample_manifests(distinct, seed)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda n: post(url, manifests[n % distinct]), range(requests)))
+    elapsed = time.perf_counter() - started
+
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    latencies = np.array([latency for status, latency in results if status == 200]) * 1000
+    report = {'requests': requests, 'seconds': elapsed, 'requests_per_second': requests / elapsed,
+              'status': statuses}
+    if len(latencies):
+        report.update(zip(('p50_ms', 'p90_ms', 'p99_ms'), np.percentile(latencies, [50, 90, 99]).tolist()))
+    with request.urlopen(f"{url}/metrics") as response:
+        report['server'] = json.loads(response.read())
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local JSON-over-HTTP packing service.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve_args = commands.add_parser('serve')
+    serve_args.add_argument('--host', default='127.0.0.1')
+    serve_args.add_argument('--port', type=int, default=8765)
+    serve_args.add_argument('--workers', type=int, default=None)
+    serve_args.add_argument('--queue', type=int, default=64, help="max manifests computing or waiting")
+    serve_args.add_argument('--max-optimize', type=float, default=MAX_OPTIMIZE, metavar='SECONDS',
+                            help="reject manifests asking for a longer \"optimize\" time")
+    test_args = commands.add_parser('loadtest')
+    test_args.add_argument('--url', default='http://127.0.0.1:8765')
+    test_args.add_argument('--requests', type=int, default=500)
+    test_args.add_argument('--concurrency', type=int, default=32)
+    test_args.add_argument('--distinct', type=int, default=20, help="number of different manifests sent")
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        serve(args.host, args.port, args.workers, args.queue, args.max_optimize)
+    else:
+        print(json.dumps(load_test(args.url, args.requests, args.concurrency, args.distinct), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+import numpy as np
+
+from packing import MIN_SUPPORT
+
+# -----------------------------
+# ตรวจความถูกต้องของแผนการจัดวาง
+# -----------------------------
+# ตรวจ: อยู่ในพื้นที่, ไม่ซ้อนทับกัน, มีของรองรับด้านล่างพอ, น้ำหนักรวม
+# แทนการเทียบทุกคู่ O(n²) แบ่งกล่องเป็นระดับตามขนาด: ระดับ l คือกล่องที่ยาวไม่เกิน 2^l เท่าของค่ามัธยฐานทุกแกน
+# ระดับหนึ่งใส่ลงตารางช่องขนาดเท่าขีดของระดับ (บวกค่าคลาดเคลื่อน) ตามมุมล่าง กล่องที่ไม่ใหญ่กว่านั้น
+# จะแตะ/ทับกล่องในระดับนี้ได้ก็ต่อเมื่อมุมล่างอยู่ในช่องเดียวกันหรือติดกัน (ขยับ -1, 0, +1 ทุกแกน)
+# กล่องยาวพิเศษไม่กี่ใบจึงไม่ทำให้ช่องของกล่องทั่วไปใหญ่ตาม ระดับที่มีกล่องน้อยเทียบตรงกับทุกกล่องแทน
+
+# ค่าคลาดเคลื่อนของพิกัด (ซม.) เพราะผลการจัดเก็บเป็น float32
+EPSILON = 1e-3
+
+# ปัญหาที่ทำให้แผนใช้ไม่ได้ (การรองรับไม่พอเป็นเพียงคำเตือน เพราะวิธี cursor ไม่ได้ตรวจ)
+BLOCKING = ('out_of_bounds', 'overlap', 'overweight', 'weight_mismatch')
+
+NEIGHBORS = np.array([(i, j, k) for i in (-1, 0, 1) for j in (-1, 0, 1) for k in (-1, 0, 1)])
+
+# ระดับที่มีกล่องไม่เกินจำนวนนี้เทียบตรงกับทุกกล่อง ถูกกว่าการค้นช่องข้างเคียง 27 ช่อง
+DIRECT_MEMBERS = 16
+
+
+def neighbor_pairs(query, member):
+    # พิกัดช่อง (int) ของกล่องที่ค้นและกล่องในตาราง คืนคู่ (ดัชนีใน query, ดัชนีใน member)
+    # ที่ช่องอยู่ห่างกันไม่เกินหนึ่งช่องทุกแกน
+    shape = np.maximum(query.max(axis=0), member.max(axis=0)) + 3
+    keys = np.ravel_multi_index((member + 1).T, shape)
+    order = np.argsort(keys, kind='stable')
+    cells, starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+
+    first, second = [], []
+    for offset in NEIGHBORS:
+        target = np.ravel_multi_index((query + 1 + offset).T, shape)
+        slot = np.searchsorted(cells, target)
+        slot = np.minimum(slot, len(cells) - 1)
+        found = cells[slot] == target
+        boxes = np.flatnonzero(found)
+        sizes = counts[slot[boxes]]
+        # กล่อง i จับคู่กับทุกกล่องในช่องเป้าหมาย
+        first.append(np.repeat(boxes, sizes))
+        within = np.arange(len(first[-1])) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        second.append(order[np.repeat(starts[slot[boxes]], sizes) + within])
+    return np.concatenate(first), np.concatenate(second)
+
+def candidate_pairs(lo, hi):
+    # คู่ (i, j) ที่ i < j ซึ่งอาจแตะหรือทับกัน (มีคู่เกินได้ แต่ไม่ขาดคู่ที่แตะกันจริง)
+    if len(lo) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    extent = hi - lo
+    median = np.maximum(np.median(extent, axis=0), EPSILON)
+    levels = np.ceil(np.log2(np.maximum((extent / median).max(axis=1), 1))).astype(np.int64)
+
+    first, second = [], []
+    for level in np.unique(levels).tolist():
+        members = np.flatnonzero(levels == level)
+        queries = np.flatnonzero(levels <= level)
+        if len(members) <= DIRECT_MEMBERS:
+            touch = ((lo[queries, None] <= hi[None, members] + EPSILON) &
+                     (lo[None, members] <= hi[queries, None] + EPSILON)).all(axis=2)
+            q, m = np.nonzero(touch)
+        else:
+            # กล่องที่แตะกันมีมุมล่างห่างกันไม่เกินขีดของระดับ + EPSILON ช่องที่กว้างกว่านั้นจึงห่างกันไม่เกินหนึ่งช่อง
+            cell = median * 2.0 ** level + 2 * EPSILON
+            coords = np.floor((lo - lo.min(axis=0)) / cell).astype(np.int64)
+            q, m = neighbor_pairs(coords[queries], coords[members])
+        i, j = queries[q], members[m]
+        # คู่ในระดับเดียวกันพบทั้งสองทาง เก็บทางเดียว คู่ข้ามระดับพบครั้งเดียวที่ระดับของกล่องที่ใหญ่กว่า
+        keep = (levels[i] < level) | (i < j)
+        first.append(np.minimum(i[keep], j[keep]))
+        second.append(np.maximum(i[keep], j[keep]))
+    return np.concatenate(first), np.concatenate(second)
+
+def overlap_length(lo, hi, i, j, axis):
+    return np.minimum(hi[i, axis], hi[j, axis]) - np.maximum(lo[i, axis], lo[j, axis])
+
+def support_ratios(lo, hi, i, j):
+    # สัดส่วนฐานของแต่ละกล่องที่มีผิวบนของกล่องอื่นรองรับอยู่พอดี (พื้นรถนับเป็น 1)
+    area = np.clip(overlap_length(lo, hi, i, j, 0), 0, None) * np.clip(overlap_length(lo, hi, i, j, 1), 0, None)
+    supported = np.zeros(len(lo))
+    # j รองรับ i และ i รองรับ j
+    below = np.abs(hi[j, 2] - lo[i, 2]) <= EPSILON
+    np.add.at(supported, i[below], area[below])
+    above = np.abs(hi[i, 2] - lo[j, 2]) <= EPSILON
+    np.add.at(supported, j[above], area[above])
+    base = (hi[:, 0] - lo[:, 0]) * (hi[:, 1] - lo[:, 1])
+    ratios = np.minimum(supported / np.maximum(base, EPSILON), 1.0)
+    ratios[lo[:, 2] <= EPSILON] = 1.0
+    return ratios
+
+def validate_plan(placements, space_dim, max_weight=None, total_weight=None, min_support=MIN_SUPPORT,
+                  max_issues=100):
+    # คืน (counts, issues) โดย issues คือ (ชนิด, ลำดับกล่อง, รายละเอียด) ไม่เกิน max_issues รายการ
+    d = placements.data
+    lo = np.stack([d['x'], d['y'], d['z']], axis=1).astype('f8')
+    hi = lo + np.stack([d['w'], d['l'], d['h']], axis=1)
+    counts = dict.fromkeys(BLOCKING + ('unsupported',), 0)
+    issues = []
+
+    def report(kind, boxes, details):
+        counts[kind] += len(boxes)
+        for box, detail in zip(boxes[:max(max_issues - len(issues), 0)], details):
+            issues.append((kind, box, detail))
+
+    outside = np.flatnonzero(((lo < -EPSILON) | (hi > np.asarray(space_dim) + EPSILON) | (hi - lo <= 0)).any(axis=1))
+    report('out_of_bounds', outside.tolist(),
+           (f"box at {tuple(lo[n].round(2))} size {tuple((hi[n] - lo[n]).round(2))} exceeds {tuple(space_dim)}"
+            for n in outside))
+
+    i, j = candidate_pairs(lo, hi)
+    depth = np.minimum.reduce([overlap_length(lo, hi, i, j, axis) for axis in range(3)]) if len(i) else np.empty(0)
+    clash = depth > EPSILON
+    report('overlap', i[clash].tolist(),
+           (f"overlaps box {b} by {v:.2f} cm" for b, v in zip(j[clash].tolist(), depth[clash].tolist())))
+
+    ratios = support_ratios(lo, hi, i, j)
+    weak = np.flatnonzero(ratios < min_support - EPSILON)
+    report('unsupported', weak.tolist(), (f"only {ratios[n]:.0%} of the base is supported" for n in weak))
+
+    weight = float(np.sum(d['weight'], dtype='f8'))
+    if max_weight is not None and weight > max_weight + EPSILON:
+        report('overweight', [-1], [f"total weight {weight:.2f} kg exceeds {max_weight} kg"])
+    if total_weight is not None and abs(weight - total_weight) > max(EPSILON, 1e-6 * abs(total_weight)):
+        report('weight_mismatch', [-1], [f"boxes weigh {weight:.2f} kg but the plan reports {total_weight:.2f} kg"])
+    return counts, issues
+
+def is_valid(counts):
+    return not any(counts[kind] for kind in BLOCKING)